@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault('PI_BOT_BACKEND', 'sim')
+os.environ.setdefault('PI_BOT_SIM_REALTIME', '0')
+
+import cv2 as cv
+
+from core.detectors import registry, get_detector
+
+# 检测器对比
+# 用每个注册的检测后端处理同一段视频, 输出 FPS 与检测数量, 用于在速度与准确率之间选择模型
+#
+# 用法 (在项目根目录):
+#   python -m benchmark.detectors --video sample.mp4
+#   python -m benchmark.detectors --frames 100 --scale 0.5 -d haar -d lbp
+
+
+def load_frames(video, count, scale):
+    if video:
+        capture = cv.VideoCapture(video)
+    else:
+        from core.simulation import hardware
+        capture = hardware.video_capture(0)
+    frames = []
+    while len(frames) < count:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+        if scale != 1:
+            gray = cv.resize(gray, None, fx=scale, fy=scale, interpolation=cv.INTER_AREA)
+        frames.append(gray)
+    capture.release()
+    return frames
+
+
+def run(name, frames, min_size):
+    detector = get_detector(name)
+    detector.detect(frames[0], min_size)
+    detections = 0
+    hit_frames = 0
+    start = time.perf_counter()
+    for gray in frames:
+        count = len(detector.detect(gray, min_size))
+        detections += count
+        hit_frames += 1 if count else 0
+    elapsed = time.perf_counter() - start
+    return len(frames) / elapsed, detections, hit_frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='检测后端对比')
+    parser.add_argument('--video', default=os.environ.get('PI_BOT_SIM_VIDEO'), help='样例视频, 默认使用模拟画面')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--scale', type=float, default=1.0, help='检测前缩放比例')
+    parser.add_argument('-d', '--detector', action='append', help='只运行指定检测器, 可重复')
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.video, args.frames, args.scale)
+    if not frames:
+        print('没有读取到视频帧')
+        return 1
+    min_size = (max(1, int(32 * args.scale)),) * 2
+    print('%-12s %10s %12s %12s' % ('detector', 'fps', 'detections', 'hit_frames'))
+    for name in args.detector or list(registry):
+        try:
+            fps, detections, hit_frames = run(name, frames, min_size)
+        except (FileNotFoundError, cv.error) as e:
+            print('%-12s 跳过: %s' % (name, e))
+            continue
+        print('%-12s %10.1f %12d %12d' % (name, fps, detections, hit_frames))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
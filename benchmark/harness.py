@@ -0,0 +1,141 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+# 性能测试工具
+# 每个用例记录单次迭代的耗时分布 (p50/p99), CPU 时间, 内存分配峰值, 以及模拟硬件等待时间
+
+
+class VirtualTime:
+    """
+    替换被测模块中的 time 模块
+    sleep 只记录不等待, time() 每次调用前进 step 秒, 使按时间循环的函数只执行一轮
+    """
+
+    def __init__(self, step=0.0):
+        self.step = step
+        self.now = time.time()
+        self.slept = 0.0
+
+    def __getattr__(self, item):
+        return getattr(time, item)
+
+    def time(self):
+        self.now += self.step
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+
+class patch_module:
+    """
+    临时替换模块属性, 用于去掉功能循环中的休眠和界面输出
+    """
+
+    def __init__(self, module, **attrs):
+        self.module = module
+        self.attrs = attrs
+        self.saved = {}
+
+    def __enter__(self):
+        for name, value in self.attrs.items():
+            self.saved[name] = getattr(self.module, name)
+            setattr(self.module, name, value)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for name, value in self.saved.items():
+            setattr(self.module, name, value)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class BenchmarkResult:
+
+    def __init__(self, name, iterations, latencies, cpu_times, peak_allocations, simulated_wait, slept):
+        self.name = name
+        self.iterations = iterations
+        self.p50 = percentile(latencies, 50)
+        self.p99 = percentile(latencies, 99)
+        self.cpu = sum(cpu_times) / iterations
+        self.peak_alloc = max(peak_allocations) if peak_allocations else 0
+        self.simulated_wait = simulated_wait / iterations
+        self.slept = slept / iterations
+
+    def to_dict(self):
+        return {'iterations': self.iterations, 'p50': self.p50, 'p99': self.p99, 'cpu': self.cpu,
+                'peak_alloc': self.peak_alloc, 'simulated_wait': self.simulated_wait, 'slept': self.slept}
+
+    def __str__(self):
+        return '%-40s %6d %10.3f %10.3f %10.3f %10d %10.3f %10.3f' % (
+            self.name, self.iterations, self.p50 * 1000, self.p99 * 1000, self.cpu * 1000,
+            self.peak_alloc, self.simulated_wait * 1000, self.slept * 1000)
+
+
+HEADER = '%-40s %6s %10s %10s %10s %10s %10s %10s' % (
+    'name', 'iter', 'p50(ms)', 'p99(ms)', 'cpu(ms)', 'alloc(B)', 'hw(ms)', 'sleep(ms)')
+
+
+def measure(name, fn, iterations=100, warmup=3, clock=None, virtual_time=None):
+    """
+    运行 fn 若干次并统计
+    耗时与内存分配分两轮测量, 避免 tracemalloc 的开销计入耗时
+    clock 为模拟硬件的 SimulationClock, virtual_time 为替换进被测模块的 VirtualTime
+    """
+    for i in range(warmup):
+        fn()
+    wait_start = clock.simulated_wait if clock else 0.0
+    slept_start = virtual_time.slept if virtual_time else 0.0
+    latencies = []
+    cpu_times = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        fn()
+        cpu_times.append(time.thread_time() - cpu_start)
+        latencies.append(time.perf_counter() - start)
+    simulated_wait = (clock.simulated_wait if clock else 0.0) - wait_start
+    slept = (virtual_time.slept if virtual_time else 0.0) - slept_start
+
+    peak_allocations = []
+    tracemalloc.start()
+    try:
+        for i in range(min(iterations, 10)):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            fn()
+            peak_allocations.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return BenchmarkResult(name, iterations, latencies, cpu_times, peak_allocations, simulated_wait, slept)
+
+
+def save_baseline(path, results):
+    data = {result.name: result.to_dict() for result in results}
+    Path(path).write_text(json.dumps(data, indent=2, sort_keys=True), encoding='utf-8')
+
+
+def compare_baseline(path, results, tolerance=0.2):
+    """
+    与基线比较 p50 和 CPU 时间, 返回超出容差的用例
+    """
+    baseline = json.loads(Path(path).read_text(encoding='utf-8'))
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.name)
+        if expected is None:
+            continue
+        for key in ('p50', 'cpu'):
+            current = getattr(result, key)
+            if expected[key] > 0 and current > expected[key] * (1 + tolerance):
+                regressions.append((result.name, key, expected[key], current))
+    return regressions
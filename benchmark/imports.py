@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# 导入耗时与内存
+# 每个场景在新的解释器中导入, 输出导入耗时与常驻内存 (RSS), 用于确认驱动模块只在用到时才导入
+#
+# 用法 (在项目根目录):
+#   python -m benchmark.imports
+#   python -m benchmark.imports --no-sim      使用真实硬件库
+
+ROOT = Path(__file__).parent.resolve().parent
+
+SCENARIOS = [
+    ('python', []),
+    ('core.devices', ['core.devices']),
+    ('core.function', ['core.function']),
+    ('driver.buzzer', ['core.devices.buzzer']),
+    ('driver.smog', ['core.devices.smog']),
+    ('driver.thermometer', ['core.devices.thermometer']),
+    ('driver.infrared', ['core.devices.infrared']),
+    ('driver.pcf8591', ['core.devices.pcf8591']),
+    ('driver.oled', ['core.devices.oled']),
+    ('driver.camera', ['core.devices.camera']),
+    ('unit.no-camera', ['core.function', 'core.devices.buzzer', 'core.devices.smog', 'core.devices.thermometer',
+                        'core.devices.infrared', 'core.devices.pcf8591', 'core.devices.oled']),
+    ('unit.full', ['core.function', 'core.devices.buzzer', 'core.devices.smog', 'core.devices.thermometer',
+                   'core.devices.infrared', 'core.devices.pcf8591', 'core.devices.oled', 'core.devices.camera']),
+]
+
+PROBE = '''
+import importlib, json, sys, time
+
+def rss():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+before = rss()
+start = time.perf_counter()
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'rss': rss(), 'rss_delta': rss() - before, 'modules': len(sys.modules)}))
+'''
+
+
+def probe(modules, env):
+    result = subprocess.run([sys.executable, '-c', PROBE] + modules, cwd=str(ROOT), env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode:
+        return None, result.stderr.strip().splitlines()[-1]
+    return json.loads(result.stdout.strip().splitlines()[-1]), None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='模块导入耗时与内存')
+    parser.add_argument('--no-sim', action='store_true', help='不使用模拟硬件')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='每个场景重复次数, 取最小值')
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if not args.no_sim:
+        env.setdefault('PI_BOT_BACKEND', 'sim')
+        env.setdefault('PI_BOT_SIM_REALTIME', '0')
+    print('%-20s %12s %10s %12s %9s' % ('scenario', 'import(ms)', 'rss(MB)', 'delta(MB)', 'modules'))
+    for name, modules in SCENARIOS:
+        samples = []
+        error = None
+        for i in range(args.repeat):
+            sample, error = probe(modules, env)
+            if sample is None:
+                break
+            samples.append(sample)
+        if not samples:
+            print('%-20s 失败: %s' % (name, error))
+            continue
+        best = min(samples, key=lambda sample: sample['seconds'])
+        print('%-20s %12.1f %10.1f %12.1f %9d' % (name, best['seconds'] * 1000, best['rss'] / 2 ** 20,
+                                                   best['rss_delta'] / 2 ** 20, best['modules']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import argparse
+import datetime
+import os
+import sys
+from pathlib import Path
+
+# 性能测试默认使用模拟硬件, 硬件等待只记录不休眠
+os.environ.setdefault('PI_BOT_BACKEND', 'sim')
+os.environ.setdefault('PI_BOT_SIM_REALTIME', '0')
+
+from benchmark.harness import VirtualTime, patch_module, measure, save_baseline, compare_baseline, HEADER
+
+# 用法 (在项目根目录):
+#   python -m benchmark.run                    运行全部用例
+#   python -m benchmark.run -k oled            只运行名称包含 oled 的用例
+#   python -m benchmark.run --save             保存基线到 benchmark/baselines.json
+#   python -m benchmark.run --compare          与基线比较, 变慢超过容差时返回非 0
+
+DEFAULT_BASELINE = Path(__file__).parent.joinpath('baselines.json')
+
+
+class HeadlessCv:
+    """
+    去掉 cv.imshow / cv.waitKey, 只测量采集与检测本身
+    """
+
+    def __init__(self, cv):
+        self.cv = cv
+
+    def __getattr__(self, item):
+        return getattr(self.cv, item)
+
+    @staticmethod
+    def imshow(name, frame):
+        pass
+
+    @staticmethod
+    def waitKey(delay=0):
+        return -1
+
+
+class BenchmarkBench:
+    """
+    在模拟硬件上按 main.py 的接线创建设备与功能
+    """
+
+    def __init__(self):
+        from core.simulation import hardware
+        from core.devices import Buzzer, Smog, Thermometer, BodyInfraredSensor, OledDisplay, PCF8591, Camera
+        from lib.enums import DevicesId, GpioBmcEnums, Constants
+        from luma.core.sprite_system import framerate_regulator
+        self.hardware = hardware
+        self.buzzer = Buzzer(DevicesId.DEFAULT_BUZZER, GpioBmcEnums.GPIO_7)
+        self.smog = Smog(DevicesId.DEFAULT_SMOG, GpioBmcEnums.GPIO_11, Constants.DO_TYPE)
+        self.thermometer = Thermometer(DevicesId.DEFAULT_THERMOMETER, GpioBmcEnums.GPIO_12)
+        self.body_infrared_sensor = BodyInfraredSensor(DevicesId.DEFAULT_BODY_INFRARED_SENSOR,
+                                                       GpioBmcEnums.GPIO_13)
+        self.oled_display = OledDisplay(DevicesId.DEFAULT_OLED_DISPLAY)
+        # 不限帧率, 只测量单帧绘制成本
+        self.oled_display.regulator = framerate_regulator(fps=0)
+        self.pcf8591 = PCF8591(DevicesId.DEFAULT_PCF8591, 1, 0x48)
+        self.camera = Camera(DevicesId.DEFAULT_CAMERA, GpioBmcEnums.GPIO_15)
+        self.frame = self.camera.cap.read()[1]
+        self.pipelines = []
+
+    def set_input(self, channel, level):
+        self.hardware.gpio.set_input(channel, level)
+
+    def close(self):
+        self.buzzer.stop()
+        for pipeline in self.pipelines:
+            pipeline.stop()
+
+
+def function_cases(bench):
+    from core.function import SmokeDetectionFunction, BodyDetectionFunction, OledDisplayFunction, \
+        LightingDetectionFunction, VideoOutputFunction
+    from lib.enums import FunctionId, GpioBmcEnums
+
+    # 等待超时为 0, 空闲时只测量一次电平检查
+    smoke = SmokeDetectionFunction(FunctionId.SMOKE_DETECTION, bench.buzzer, bench.smog, wait_timeout=0)
+    body = BodyDetectionFunction(FunctionId.BODY_DETECTION, bench.body_infrared_sensor, bench.buzzer,
+                                 wait_timeout=0)
+    oled = OledDisplayFunction(FunctionId.OLED_DISPLAY, bench.oled_display, bench.thermometer)
+    lighting = LightingDetectionFunction(FunctionId.LIGHTING_DETECTION, bench.pcf8591, 0, bench.camera)
+    video = VideoOutputFunction(FunctionId.VIDEO_OUTPUT, bench.camera)
+
+    def with_input(channel, level, fn):
+        def run():
+            bench.set_input(channel, level)
+            fn()
+        return run
+
+    def video_output():
+        # 单次迭代为等待并显示一个检测结果, 流水线在第一次迭代时启动
+        if not video.pipeline.running.is_set():
+            video.pipeline.start()
+            bench.pipelines.append(video.pipeline)
+        video.function()
+
+    def oled_page(content_index, changed=True):
+        if changed:
+            return lambda: oled.render(content_index)
+        return lambda: oled.render(content_index, oled.page_key(content_index))
+
+    return [
+        ('function.smoke_detection.idle', with_input(GpioBmcEnums.GPIO_11, 1, smoke.function)),
+        ('function.smoke_detection.alarm', with_input(GpioBmcEnums.GPIO_11, 0, smoke.function)),
+        ('function.body_detection.idle', with_input(GpioBmcEnums.GPIO_13, 0, body.function)),
+        ('function.body_detection.alarm', with_input(GpioBmcEnums.GPIO_13, 1, body.function)),
+        ('function.oled_display.time', oled_page(0)),
+        ('function.oled_display.time.unchanged', oled_page(0, False)),
+        ('function.oled_display.weather', oled_page(1)),
+        ('function.oled_display.temperature', oled_page(2)),
+        ('function.oled_display.temperature.unchanged', oled_page(2, False)),
+        ('function.lighting_detection', lighting.function),
+        ('function.video_output', video_output),
+    ]
+
+
+def device_cases(bench):
+    import cv2 as cv
+    from core.video import FaceTracker
+    gray = cv.cvtColor(bench.frame, cv.COLOR_BGR2GRAY)
+    tracker = FaceTracker(bench.camera.full_detect, detect_interval=5, scale=0.5)
+    return [
+        ('device.oled_display.display_time', lambda: bench.oled_display.display_time(datetime.datetime.now())),
+        ('device.oled_display.display_weather', bench.oled_display.display_weather),
+        ('device.oled_display.display_temperature',
+         lambda: bench.oled_display.display_temperature(24.0, 55.0)),
+        ('device.oled_display.logo_frames', bench.oled_display.logo_frames),
+        ('device.pcf8591.read', lambda: bench.pcf8591.read(0)),
+        ('device.pcf8591.read_all', bench.pcf8591.read_all),
+        ('device.thermometer.detection', bench.thermometer.detection),
+        ('device.thermometer.sample', bench.thermometer.sample),
+        ('device.camera.face_detection', lambda: bench.camera.face_detection(bench.frame.copy())),
+        ('device.camera.face_tracking', lambda: tracker.update(gray)),
+    ]
+
+
+def run(iterations, keyword=None):
+    import core.devices.camera
+    import core.devices.oled
+    import core.devices.thermometer
+    import core.function
+    bench = BenchmarkBench()
+    results = []
+    device_time = VirtualTime()
+    with patch_module(core.devices.oled, time=device_time), patch_module(core.devices.thermometer, time=device_time), \
+            patch_module(core.devices.camera, time=device_time, cv=HeadlessCv(core.devices.camera.cv)):
+        try:
+            for name, fn in device_cases(bench) + function_cases(bench):
+                if keyword and keyword not in name:
+                    continue
+                function_time = VirtualTime()
+                with patch_module(core.function, time=function_time):
+                    result = measure(name, fn, iterations, clock=bench.hardware.clock,
+                                     virtual_time=function_time)
+                print(result)
+                results.append(result)
+        finally:
+            bench.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='pi-bot 功能循环与设备驱动性能测试')
+    parser.add_argument('-n', '--iterations', type=int, default=50)
+    parser.add_argument('-k', '--keyword', help='只运行名称包含该关键字的用例')
+    parser.add_argument('--save', nargs='?', const=str(DEFAULT_BASELINE), help='保存基线')
+    parser.add_argument('--compare', nargs='?', const=str(DEFAULT_BASELINE), help='与基线比较')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='允许变慢的比例')
+    args = parser.parse_args(argv)
+
+    print(HEADER)
+    results = run(args.iterations, args.keyword)
+    if args.save:
+        save_baseline(args.save, results)
+        print('基线已保存:', args.save)
+    if args.compare:
+        regressions = compare_baseline(args.compare, results, args.tolerance)
+        for name, key, expected, current in regressions:
+            print('性能下降 %s %s: %.3fms -> %.3fms' % (name, key, expected * 1000, current * 1000))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
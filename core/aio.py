@@ -0,0 +1,271 @@
+import asyncio
+import functools
+import threading
+from abc import abstractmethod, ABC
+from concurrent.futures import ThreadPoolExecutor
+
+from core.function import Function
+from lib.enums import ExecutionMode, FunctionId
+from lib.utils import WeatherUtils
+
+# asyncio 接口
+# 一个事件循环驱动所有传感器, 定时器, 天气获取与网络输出
+# 阻塞的设备调用 (I2C, DHT11, 蜂鸣器节奏, 摄像头) 由 AsyncDevice 放到线程池执行, 原有的线程式 Function 通过 FunctionAdapter 运行
+
+
+class AsyncDevice:
+    """
+    设备的异步代理
+    设备方法返回可 await 的协程, 在线程池中执行; 非方法属性直接返回
+        pcf8591 = AsyncDevice(device_manager.get_device(DevicesId.DEFAULT_PCF8591))
+        luminance = await pcf8591.read(0)
+    """
+
+    def __init__(self, device, executor=None):
+        self.device = device
+        self.executor = executor
+
+    def __getattr__(self, name):
+        attr = getattr(self.device, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+
+class AsyncFunction(ABC):
+    """
+    异步功能基类, 在事件循环中循环 await function()
+    pause/resume/stop 可以在任意线程调用
+    """
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.loop = None
+        self.status = None
+        self.running = True
+        self.task = None
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.status = asyncio.Event()
+        self.status.set()
+        await self.open()
+        try:
+            while self.running:
+                await self.status.wait()
+                if self.running:
+                    await self.function()
+        finally:
+            await self.close()
+
+    @abstractmethod
+    async def function(self):
+        pass
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def call_in_loop(self, fn):
+        if self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(fn)
+
+    def pause(self):
+        self.call_in_loop(lambda: self.status.clear())
+
+    def resume(self):
+        self.call_in_loop(lambda: self.status.set())
+
+    def stop(self):
+        self.running = False
+        self.call_in_loop(lambda: self.status.set())
+        if self.task is not None:
+            self.call_in_loop(self.task.cancel)
+
+
+class FunctionAdapter(AsyncFunction, ABC):
+    """
+    在事件循环中运行线程式 Function
+    声明了 period 的功能按周期调用 step(), 阻塞的 step() 放到线程池执行
+    没有声明 period 的功能仍在自己的线程中运行, 这里只等待线程结束
+    """
+
+    def __init__(self, function: Function, executor=None):
+        super().__init__(function.thread_id)
+        self.function_thread = function
+        self.executor = executor
+        self.trigger_event = None
+
+    async def open(self):
+        function = self.function_thread
+        if function.period is None:
+            function.start()
+            return
+        await self.loop.run_in_executor(self.executor, function.open)
+        if function.trigger is not None:
+            self.trigger_event = asyncio.Event()
+            function.trigger.add_listener(lambda channel: self.call_in_loop(self.trigger_event.set))
+
+    async def close(self):
+        function = self.function_thread
+        if function.period is not None:
+            await self.loop.run_in_executor(self.executor, function.close)
+
+    async def function(self):
+        function = self.function_thread
+        if function.period is None:
+            await self.loop.run_in_executor(self.executor, function.join)
+            self.running = False
+            return
+        if function.blocking:
+            delay = await self.loop.run_in_executor(self.executor, function.step)
+        else:
+            delay = function.step()
+        await self.sleep(function.period if delay is None else delay)
+
+    async def sleep(self, delay):
+        if self.trigger_event is None:
+            await asyncio.sleep(delay)
+            return
+        # 边沿到来时提前结束等待
+        self.trigger_event.clear()
+        try:
+            await asyncio.wait_for(self.trigger_event.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def pause(self):
+        super().pause()
+        self.function_thread.pause()
+
+    def resume(self):
+        super().resume()
+        self.function_thread.resume()
+
+    def stop(self):
+        self.function_thread.stop()
+        super().stop()
+
+
+class WeatherFunction(AsyncFunction, ABC):
+    """
+    定时获取天气, 请求在线程池中执行, 不阻塞事件循环
+    """
+
+    def __init__(self, thread_id, location_code=310118, interval=30 * 60, retry_interval=60):
+        super().__init__(thread_id)
+        self.location_code = location_code
+        self.interval = interval
+        self.retry_interval = retry_interval
+
+    async def open(self):
+        # 启动时已经同步获取过天气的, 等到下一个周期再刷新
+        if WeatherUtils.has_data:
+            await asyncio.sleep(self.interval)
+
+    async def function(self):
+        try:
+            data = await self.loop.run_in_executor(None, WeatherUtils.get_weather, self.location_code)
+        except Exception as e:
+            print('获取天气信息失败:', e)
+            data = None
+        await asyncio.sleep(self.interval if data else self.retry_interval)
+
+
+class AsyncFunctionManager:
+    """
+    与 FunctionManager 接口一致, 所有功能在同一个事件循环中运行
+    事件循环运行在独立线程中, register/pause/stop 可以在任意线程调用
+    """
+
+    mode = ExecutionMode.ASYNCIO
+
+    def __init__(self, max_workers=4):
+        self.function_threads_dict = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async-io')
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.executor)
+        self.thread = threading.Thread(target=self.loop.run_forever, name='asyncio-loop')
+        self.thread.start()
+
+    def register(self, function_id, function):
+        if isinstance(function, Function):
+            function = FunctionAdapter(function, self.executor)
+        self.function_threads_dict.update({function_id: function})
+        self.loop.call_soon_threadsafe(self.create_task, function)
+        return function
+
+    def register_weather(self, location_code=310118):
+        return self.register(FunctionId.WEATHER_UPDATE, WeatherFunction(FunctionId.WEATHER_UPDATE, location_code))
+
+    def create_task(self, function: AsyncFunction):
+        function.task = self.loop.create_task(self.run_function(function))
+
+    @staticmethod
+    async def run_function(function: AsyncFunction):
+        try:
+            await function.run()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print('功能执行异常', function.thread_id, e)
+
+    def device(self, device):
+        return AsyncDevice(device, self.executor)
+
+    def pause_function(self, function_id):
+        self.function_threads_dict.get(function_id).pause()
+
+    def pause_all(self):
+        for function in self.function_threads_dict.values():
+            function.pause()
+
+    def resume_function(self, function_id):
+        self.function_threads_dict.get(function_id).resume()
+
+    def resume_all(self):
+        for function in self.function_threads_dict.values():
+            function.resume()
+
+    def stop_function(self, function_id):
+        self.function_threads_dict.get(function_id).stop()
+
+    def stop_all(self):
+        functions = list(self.function_threads_dict.values())
+        self.function_threads_dict.clear()
+        for function in functions:
+            function.stop()
+        tasks = [function.task for function in functions if function.task is not None]
+        if tasks:
+            future = asyncio.run_coroutine_threadsafe(self.wait_tasks(tasks), self.loop)
+            future.result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.executor.shutdown(wait=False)
+
+    def join(self, poll=1.0):
+        """
+        阻塞到事件循环退出
+        主线程返回后解释器开始退出, concurrent.futures 会拒绝新的任务, run_in_executor 全部失败, 因此主线程需要在这里等待
+        """
+        while self.thread.is_alive():
+            self.thread.join(poll)
+
+    @staticmethod
+    async def wait_tasks(tasks):
+        await asyncio.wait(tasks, timeout=5)
+
+    def stats(self):
+        return {}
@@ -0,0 +1,47 @@
+import os
+
+from lib.enums import HardwareBackend
+
+# 硬件后端
+# 通过环境变量 PI_BOT_BACKEND 选择 pi (默认, 真实硬件) 或 sim (模拟硬件)
+# 设备驱动只通过本模块获取 GPIO / SMBus / DHT / 摄像头, 不直接导入硬件库
+
+
+def current():
+    return HardwareBackend(os.environ.get('PI_BOT_BACKEND', HardwareBackend.PI.value))
+
+
+def is_simulated():
+    return current() == HardwareBackend.SIM
+
+
+def load_gpio():
+    if is_simulated():
+        from core.simulation import hardware
+        return hardware.gpio
+    from RPi import GPIO
+    return GPIO
+
+
+def open_smbus(bus):
+    if is_simulated():
+        from core.simulation import hardware
+        return hardware.smbus(bus)
+    import smbus
+    return smbus.SMBus(bus)
+
+
+def load_dht():
+    if is_simulated():
+        from core.simulation import hardware
+        return hardware.dht
+    import Adafruit_DHT
+    return Adafruit_DHT
+
+
+def open_video_capture(index):
+    if is_simulated():
+        from core.simulation import hardware
+        return hardware.video_capture(index)
+    import cv2 as cv
+    return cv.VideoCapture(index)
@@ -1,3 +1,4 @@
+import os
 import time
 
 from core import schedule_task
@@ -5,7 +6,8 @@ from core.devices import DeviceManager
 from core.function import FunctionManager, SmokeDetectionFunction, BodyDetectionFunction, ThermometerFunction, \
     OledDisplayFunction, LightingDetectionFunction, VideoOutputFunction
 from core.gpio import GPIO
-from lib.enums import DevicesId, FunctionId
+from lib import database
+from lib.enums import DevicesId, FunctionId, VideoOutput, ExecutionMode
 
 
 class Bot:
@@ -15,6 +17,8 @@ class Bot:
         print("RPI INFO:" + str(GPIO.RPI_INFO))
         self.device_manager = device_manager
         self.function_manager = function_manager
+        # 设置 PI_BOT_DB 时记录传感器读数与报警事件
+        self.writer = database.open_writer()
 
     def on(self):
         self.smoke_detection()
@@ -27,41 +31,73 @@ class Bot:
     def destroy(self):
         self.function_manager.stop_all()
         self.device_manager.destroy()
+        if self.writer is not None:
+            self.writer.stop()
+
+    def camera_recorder(self):
+        camera = self.device_manager.get_device(DevicesId.DEFAULT_CAMERA)
+        return camera.recorder if camera is not None else None
 
     def smoke_detection(self):
+        smog = self.device_manager.get_device(DevicesId.DEFAULT_SMOG)
+        if smog is None:
+            return
         smoke_detection_function = SmokeDetectionFunction(FunctionId.SMOKE_DETECTION,
                                                           self.device_manager.get_device(DevicesId.DEFAULT_BUZZER),
-                                                          self.device_manager.get_device(DevicesId.DEFAULT_SMOG))
+                                                          smog,
+                                                          recorder=self.camera_recorder(), writer=self.writer)
         self.function_manager.register(smoke_detection_function.thread_id, smoke_detection_function)
 
     def body_detection(self):
+        body_infrared_sensor = self.device_manager.get_device(DevicesId.DEFAULT_BODY_INFRARED_SENSOR)
+        if body_infrared_sensor is None:
+            return
         body_detection_function = BodyDetectionFunction(FunctionId.BODY_DETECTION,
-                                                        self.device_manager.get_device(DevicesId.DEFAULT_BODY_INFRARED_SENSOR),
-                                                        self.device_manager.get_device(DevicesId.DEFAULT_BUZZER))
+                                                        body_infrared_sensor,
+                                                        self.device_manager.get_device(DevicesId.DEFAULT_BUZZER),
+                                                        recorder=self.camera_recorder(), writer=self.writer)
         self.function_manager.register(body_detection_function.thread_id, body_detection_function)
 
     def thermometer_detection(self):
-        thermometer_detection = ThermometerFunction(FunctionId.THERMOMETER_DETECTION,
-                                                    self.device_manager.get_device(DevicesId.DEFAULT_THERMOMETER))
+        thermometer = self.device_manager.get_device(DevicesId.DEFAULT_THERMOMETER)
+        if thermometer is None:
+            return
+        thermometer_detection = ThermometerFunction(FunctionId.THERMOMETER_DETECTION, thermometer, writer=self.writer)
         self.function_manager.register(thermometer_detection.thread_id, thermometer_detection)
 
     def oled_display_info(self):
+        oled_display = self.device_manager.get_device(DevicesId.DEFAULT_OLED_DISPLAY)
+        if oled_display is None:
+            return
         schedule_task.weather_task()
-        oled_display_function = OledDisplayFunction(FunctionId.OLED_DISPLAY,
-                                                    self.device_manager.get_device(DevicesId.DEFAULT_OLED_DISPLAY),
+        if self.function_manager.mode == ExecutionMode.ASYNCIO:
+            # 事件循环中定时刷新天气
+            self.function_manager.register_weather()
+        # 温湿度传感器不可用时温湿度页显示 --
+        oled_display_function = OledDisplayFunction(FunctionId.OLED_DISPLAY, oled_display,
                                                     self.device_manager.get_device(DevicesId.DEFAULT_THERMOMETER))
         self.function_manager.register(oled_display_function.thread_id, oled_display_function)
 
     def lighting_detection(self):
+        pcf8591 = self.device_manager.get_device(DevicesId.DEFAULT_PCF8591)
+        if pcf8591 is None:
+            return
+        # 没有摄像头时仍采集并记录亮度, 只是不控制红外灯
         lighting_detection_function = LightingDetectionFunction(FunctionId.LIGHTING_DETECTION,
-                                                                self.device_manager.get_device(DevicesId.DEFAULT_PCF8591),
+                                                                pcf8591,
                                                                 0,
-                                                                self.device_manager.get_device(DevicesId.DEFAULT_CAMERA))
+                                                                self.device_manager.get_device(DevicesId.DEFAULT_CAMERA),
+                                                                writer=self.writer)
         self.function_manager.register(lighting_detection_function.thread_id, lighting_detection_function)
 
     def video_output(self):
-        video_output_function = VideoOutputFunction(FunctionId.VIDEO_OUTPUT,
-                                                    self.device_manager.get_device(DevicesId.DEFAULT_CAMERA))
+        camera = self.device_manager.get_device(DevicesId.DEFAULT_CAMERA)
+        if camera is None:
+            return
+        camera.set_presence_sensor(self.device_manager.get_device(DevicesId.DEFAULT_BODY_INFRARED_SENSOR))
+        # 无显示器的设备设置 PI_BOT_VIDEO_OUTPUT=mjpeg, 通过 http://<ip>:8080/ 查看
+        output = VideoOutput(os.environ.get('PI_BOT_VIDEO_OUTPUT', VideoOutput.WINDOW.value))
+        video_output_function = VideoOutputFunction(FunctionId.VIDEO_OUTPUT, camera, output=output)
         self.function_manager.register(video_output_function.thread_id, video_output_function)
 
 
@@ -0,0 +1,114 @@
+import threading
+from abc import abstractmethod, ABC
+from pathlib import Path
+
+import cv2 as cv
+
+# 检测器注册表
+# 按名称选择检测后端与模型, 模型路径相对 resource/face-data 解析, 分类器在第一次检测时才加载
+
+MODEL_DIR = Path(__file__).parent.resolve().parent.joinpath('resource', 'face-data')
+
+
+class Detector(ABC):
+
+    def __init__(self, model=None, scale_factor=1.1, min_neighbors=3):
+        self.model = model
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+
+    @abstractmethod
+    def detect(self, gray, min_size=(32, 32)):
+        pass
+
+
+class CascadeDetector(Detector):
+    """
+    Haar / LBP 级联分类器
+    CascadeClassifier 不是线程安全的, 每个检测线程各自加载一次
+    """
+
+    def __init__(self, model, scale_factor=1.1, min_neighbors=3):
+        super().__init__(model, scale_factor, min_neighbors)
+        self.local = threading.local()
+
+    def classifier(self):
+        classifier = getattr(self.local, 'classifier', None)
+        if classifier is None:
+            classifier = cv.CascadeClassifier(str(self.model))
+            if classifier.empty():
+                raise FileNotFoundError('无法加载检测模型: %s' % self.model)
+            self.local.classifier = classifier
+        return classifier
+
+    def detect(self, gray, min_size=(32, 32)):
+        return self.classifier().detectMultiScale(gray, scaleFactor=self.scale_factor,
+                                                  minNeighbors=self.min_neighbors, minSize=min_size)
+
+
+class HogPeopleDetector(Detector):
+    """
+    HOG 行人检测
+    OpenCV 4 已不能加载 hogcascade_pedestrians.xml, 改用 OpenCV 自带的 HOG + SVM 行人模型
+    """
+
+    def __init__(self, model=None, scale_factor=1.05, min_neighbors=3):
+        super().__init__(model, scale_factor, min_neighbors)
+        self.local = threading.local()
+
+    def descriptor(self):
+        hog = getattr(self.local, 'hog', None)
+        if hog is None:
+            hog = cv.HOGDescriptor()
+            hog.setSVMDetector(cv.HOGDescriptor_getDefaultPeopleDetector())
+            self.local.hog = hog
+        return hog
+
+    def detect(self, gray, min_size=(32, 32)):
+        rects, weights = self.descriptor().detectMultiScale(gray, winStride=(8, 8), scale=self.scale_factor)
+        return [tuple(rect) for rect in rects if rect[2] >= min_size[0] and rect[3] >= min_size[1]]
+
+
+# 名称 -> (检测器类, 默认模型)
+registry = {
+    'haar': (CascadeDetector, 'haarcascades/haarcascade_frontalface_default.xml'),
+    'haar-alt': (CascadeDetector, 'haarcascades/haarcascade_frontalface_alt.xml'),
+    'haar-alt2': (CascadeDetector, 'haarcascades/haarcascade_frontalface_alt2.xml'),
+    'lbp': (CascadeDetector, 'lbpcascades/lbpcascade_frontalface_improved.xml'),
+    'lbp-legacy': (CascadeDetector, 'lbpcascades/lbpcascade_frontalface.xml'),
+    'hog': (HogPeopleDetector, None),
+}
+
+_detectors = {}
+
+_lock = threading.Lock()
+
+
+def register(name, detector_class, model=None):
+    registry[name] = (detector_class, model)
+
+
+def resolve_model(model):
+    if model is None:
+        return None
+    path = Path(model)
+    if not path.is_absolute():
+        path = MODEL_DIR.joinpath(path)
+    return path
+
+
+def get_detector(name='haar', model=None, **kwargs):
+    """
+    获取检测器, 相同名称与模型只创建一次
+    """
+    if name not in registry:
+        raise KeyError('未知的检测器: %s, 可选: %s' % (name, ', '.join(registry)))
+    detector_class, default_model = registry[name]
+    path = resolve_model(model or default_model)
+    key = (name, path, tuple(sorted(kwargs.items())))
+    with _lock:
+        detector = _detectors.get(key)
+        if detector is None:
+            detector = detector_class(path, **kwargs)
+            _detectors[key] = detector
+        return detector
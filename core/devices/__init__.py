@@ -0,0 +1,63 @@
+import importlib
+
+from core.devices.base import Device, DeviceSpec, DeviceManager, EdgeInput
+
+# 设备驱动插件
+# 每种设备的驱动在单独的模块中, 只有用到该类型的设备时才导入对应模块及其依赖 (cv2, luma, PIL, Adafruit_DHT, simpleaudio)
+# from core.devices import Camera 在第一次访问时才导入 core.devices.camera (PEP 562)
+# 其他位置的驱动通过 register 注册: register('Relay', 'plugins.relay')
+
+drivers = {
+    'Buzzer': 'core.devices.buzzer',
+    'BuzzerPattern': 'core.devices.buzzer',
+    'buzzer_pattern': 'core.devices.buzzer',
+    'BEEP': 'core.devices.buzzer',
+    'SMOKE_ALARM': 'core.devices.buzzer',
+    'BODY_WARNING': 'core.devices.buzzer',
+    'Smog': 'core.devices.smog',
+    'Thermometer': 'core.devices.thermometer',
+    'ThermometerReading': 'core.devices.thermometer',
+    'NixieTube': 'core.devices.nixie',
+    'BodyInfraredSensor': 'core.devices.infrared',
+    'OledDisplay': 'core.devices.oled',
+    'TextRasterCache': 'core.devices.oled',
+    'LoudSpeakerBox': 'core.devices.speaker',
+    'PCF8591': 'core.devices.pcf8591',
+    'AdcSampler': 'core.devices.pcf8591',
+    'Camera': 'core.devices.camera',
+}
+
+
+def register(name, module):
+    drivers[name] = module
+
+
+def load(name):
+    """
+    导入并返回驱动
+    """
+    module = drivers.get(name)
+    if module is None:
+        raise KeyError('未注册的设备驱动: ' + name)
+    return getattr(importlib.import_module(module), name)
+
+
+def plugin(name, *args, depends=(), lazy=False, **kwargs):
+    """
+    按驱动名声明设备, 驱动模块在创建设备时才导入, 依赖的设备追加在 args 之后传给驱动
+    例如 AO 模式的烟雾传感器, 通道为 PCF8591 的输入通道 (0-3, 通道 0 接光敏电阻), 采样值 (0-255) 不低于 threshold 时报警;
+    PCF8591 作为依赖追加在位置参数之后, threshold 需要用关键字参数传入:
+        plugin('Smog', DevicesId.DEFAULT_SMOG, 1, Constants.AO_TYPE, threshold=120,
+               depends=(DevicesId.DEFAULT_PCF8591,))
+    """
+    return DeviceSpec(lambda *devices: load(name)(*args, *devices, **kwargs), depends, lazy)
+
+
+def __getattr__(name):
+    if name not in drivers:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    return load(name)
+
+
+def __dir__():
+    return sorted(list(globals()) + list(drivers))
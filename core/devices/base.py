@@ -0,0 +1,241 @@
+import threading
+import time
+from abc import abstractmethod
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from lib.enums import InputMode
+from core.gpio import GPIO
+
+
+class Device:
+
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self.lock = threading.RLock()
+
+    @abstractmethod
+    def setup(self):
+        pass
+
+    def stop(self):
+        """
+        停止设备的后台线程并释放资源, 由 DeviceManager.destroy 按启动的逆序调用
+        """
+        pass
+
+
+DeviceSpec = namedtuple('DeviceSpec', ['factory', 'depends', 'lazy'], defaults=((), False))
+
+
+class DeviceManager:
+    """
+    设备管理器
+    设备以实例或 DeviceSpec 注册, DeviceSpec 声明工厂函数, 依赖的设备 (按顺序作为工厂参数) 与是否延迟创建
+    没有依赖关系的设备在线程池中并行创建与 setup, 依赖的设备就绪后才开始; lazy 设备在第一次 get_device 时创建
+    """
+
+    def __init__(self, devices_dict=None, max_workers=4):
+        if devices_dict is None:
+            devices_dict = dict()
+        self.devices_dict = {}
+        self.specs = {}
+        self.futures = {}
+        self.init_times = {}
+        self.errors = {}
+        # 按就绪顺序记录的设备, destroy 时逆序停止
+        self.started = []
+        self.lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='device-init')
+        self.started_at = time.monotonic()
+        self.ready_time = None
+        for device_id, device in devices_dict.items():
+            if not isinstance(device, DeviceSpec):
+                device = DeviceSpec(lambda device=device: device)
+            self.specs[device_id] = device
+        for device_id, spec in self.specs.items():
+            if not spec.lazy:
+                self.start_device(device_id)
+
+    def start_device(self, device_id, path=()):
+        """
+        按依赖顺序提交设备初始化, 返回在设备就绪 (失败时为 None) 后完成的 Future
+        """
+        with self.lock:
+            if device_id in path:
+                raise ValueError('设备依赖存在循环: ' + ' -> '.join(d.value for d in path + (device_id,)))
+            future = self.futures.get(device_id)
+            if future is not None:
+                return future
+            if device_id not in self.specs:
+                # 依赖了未声明的设备, 依赖方按依赖不可用处理
+                print('设备未声明', device_id.value)
+                self.errors[device_id] = KeyError(device_id)
+                future = self.futures[device_id] = Future()
+                future.set_result(None)
+                return future
+            spec = self.specs[device_id]
+            depends = [self.start_device(depend, path + (device_id,)) for depend in spec.depends]
+            future = self.futures[device_id] = Future()
+            pending = [depend for depend in depends if not depend.done()]
+            if not pending:
+                self.executor.submit(self.init_device, device_id, future)
+                return future
+            remaining = [len(pending)]
+
+            def on_depend_done(_):
+                with self.lock:
+                    remaining[0] -= 1
+                    if remaining[0]:
+                        return
+                self.executor.submit(self.init_device, device_id, future)
+
+            for depend in pending:
+                depend.add_done_callback(on_depend_done)
+            return future
+
+    def init_device(self, device_id, future):
+        spec = self.specs[device_id]
+        start = time.monotonic()
+        device = None
+        try:
+            depends = [self.futures[depend].result() for depend in spec.depends]
+            missing = [depend.value for depend, device in zip(spec.depends, depends) if device is None]
+            if missing:
+                raise RuntimeError('依赖的设备不可用: ' + ', '.join(missing))
+            device = spec.factory(*depends)
+            print('正在启动 ', device_id.value)
+            device.setup()
+        except Exception as e:
+            print('设备初始化失败', device_id.value, e)
+            self.errors[device_id] = e
+            device = None
+        self.init_times[device_id] = time.monotonic() - start
+        if device is not None:
+            with self.lock:
+                self.devices_dict[device_id] = device
+                self.started.append(device)
+        future.set_result(device)
+
+    def wait_ready(self, timeout=None):
+        """
+        等待所有非 lazy 设备初始化完成
+        """
+        futures = [self.start_device(device_id) for device_id, spec in self.specs.items() if not spec.lazy]
+        done, not_done = wait(futures, timeout)
+        if not not_done and self.ready_time is None:
+            self.ready_time = time.monotonic() - self.started_at
+        return not not_done
+
+    def report(self):
+        for device_id, elapsed in sorted(self.init_times.items(), key=lambda item: -item[1]):
+            status = '失败' if device_id in self.errors else '就绪'
+            print('%-32s %s %8.3fs' % (device_id.value, status, elapsed))
+        if self.ready_time is not None:
+            print('设备就绪耗时: %.3fs' % self.ready_time)
+
+    def get_devices(self):
+        return self.devices_dict
+
+    def get_all_devices(self):
+        return self.devices_dict.values()
+
+    def get_all_device_id(self):
+        return self.devices_dict.keys()
+
+    def get_device(self, device_id, timeout=None):
+        """
+        返回设备, 还在初始化时等待其完成, lazy 设备在这里创建
+        """
+        device = self.devices_dict.get(device_id)
+        if device is not None or device_id not in self.specs:
+            return device
+        return self.start_device(device_id).result(timeout)
+
+    def logoff_device(self, device_id):
+        device = self.devices_dict.pop(device_id)
+        self.specs.pop(device_id, None)
+        with self.lock:
+            if device in self.started:
+                self.started.remove(device)
+
+    def destroy(self):
+        self.executor.shutdown(wait=False)
+        with self.lock:
+            started, self.started = self.started, []
+        # 逆序停止, 依赖方先于被依赖的设备停止
+        for device in reversed(started):
+            stop = getattr(device, 'stop', None)
+            if stop is None:
+                continue
+            try:
+                stop()
+            except Exception as e:
+                print('设备停止失败', device.device_id.value, e)
+        self.devices_dict = None
+
+    def get_devices_num(self):
+        return len(self.devices_dict)
+
+
+class EdgeInput:
+    """
+    数字输入
+    中断模式下由 GPIO 边沿回调 (带去抖) 唤醒等待线程, 边沿检测不可用时退回轮询模式
+    """
+
+    # 中断模式下的电平复查间隔, 防止被去抖过滤掉的边沿导致一直等待
+    recheck_interval = 1.0
+
+    def __init__(self, channel, active_level, mode=InputMode.INTERRUPT, bouncetime=200, poll_interval=0.05):
+        self.channel = channel
+        self.active_level = active_level
+        self.poll_interval = poll_interval
+        self.condition = threading.Condition()
+        self.edges = 0
+        self.listeners = []
+        self.mode = mode
+        if mode == InputMode.INTERRUPT:
+            try:
+                GPIO.add_event_detect(channel, GPIO.BOTH, callback=self.on_edge, bouncetime=bouncetime)
+            except RuntimeError as e:
+                print('GPIO', channel, '边沿检测不可用, 改为轮询模式:', e)
+                self.mode = InputMode.POLLING
+
+    def on_edge(self, channel):
+        with self.condition:
+            self.edges += 1
+            self.condition.notify_all()
+        for listener in self.listeners:
+            listener(channel)
+
+    def add_listener(self, listener):
+        """
+        注册边沿回调, 在 GPIO 回调线程中执行, 回调内不应阻塞
+        轮询模式下没有边沿回调, 由调用方按周期检查
+        """
+        self.listeners.append(listener)
+
+    def is_active(self):
+        return GPIO.input(self.channel) == self.active_level
+
+    def wait_for(self, active=True, timeout=None):
+        """
+        阻塞直到输入变为 active 指定的状态, 超时返回 False
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_active() != active:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            if self.mode == InputMode.INTERRUPT:
+                wait = self.recheck_interval if remaining is None else min(remaining, self.recheck_interval)
+                with self.condition:
+                    if self.is_active() != active:
+                        self.condition.wait(wait)
+            else:
+                time.sleep(self.poll_interval if remaining is None else min(remaining, self.poll_interval))
+        return True
+
+    def destroy(self):
+        if self.mode == InputMode.INTERRUPT:
+            GPIO.remove_event_detect(self.channel)
@@ -0,0 +1,154 @@
+import heapq
+import threading
+import time
+from abc import ABC
+from collections import namedtuple
+from lib.enums import BuzzerPriority
+from core.devices.base import Device
+from core.gpio import GPIO
+
+
+BuzzerPattern = namedtuple('BuzzerPattern', ['name', 'steps'])
+
+
+def buzzer_pattern(name, duration=0.2, loop=3, interval=0.5, cycle=1):
+    """
+    与 Buzzer.cycle 参数一致的节奏, steps 为 (响, 停) 秒数序列
+    """
+    return BuzzerPattern(name, ((duration * loop, interval),) * cycle)
+
+
+BEEP = buzzer_pattern('beep', loop=1, interval=0)
+
+SMOKE_ALARM = buzzer_pattern('smoke-alarm')
+
+BODY_WARNING = buzzer_pattern('body-warning', cycle=10)
+
+
+class Buzzer(Device, ABC):
+    """
+    蜂鸣器
+    有源蜂鸣器: 高电平无声/低电平发声
+    由一个驱动线程按优先级播放节奏, enqueue 立即返回; 高优先级的节奏会打断正在播放的低优先级节奏,
+    被打断的节奏不再继续播放, 同一节奏在排队或播放中时不会重复入队
+    """
+
+    def __init__(self, device_id, channel):
+        super().__init__(device_id)
+        self.channel = channel
+        GPIO.setup(channel, GPIO.OUT, initial=GPIO.HIGH)
+        self.condition = threading.Condition()
+        self.queue = []
+        self.counter = 0
+        self.current = None
+        self.running = True
+        self.preempted = 0
+        self.driver = threading.Thread(target=self.drive, name='buzzer', daemon=True)
+        self.driver.start()
+
+    def setup(self):
+        self.enqueue(BEEP, BuzzerPriority.NOTICE)
+
+    def on(self):
+        self.lock.acquire()
+        GPIO.output(self.channel, GPIO.LOW)
+        self.lock.release()
+
+    def off(self):
+        self.lock.acquire()
+        GPIO.output(self.channel, GPIO.HIGH)
+        self.lock.release()
+
+    def play(self, duration=0.2):
+        with self.lock:
+            GPIO.output(self.channel, GPIO.LOW)
+            time.sleep(duration)
+            GPIO.output(self.channel, GPIO.HIGH)
+
+    def loop(self, duration=0.2, loop=1):
+        self.enqueue(buzzer_pattern('loop', duration, loop, 0)).wait()
+
+    def cycle(self, duration=0.2, loop=3, interval=0.5, cycle=1):
+        """
+        播放并等待结束, 检测循环中使用 enqueue
+        """
+        self.enqueue(buzzer_pattern('cycle', duration, loop, interval, cycle)).wait()
+
+    def enqueue(self, pattern: BuzzerPattern, priority=BuzzerPriority.NOTICE):
+        """
+        加入播放队列并立即返回, 返回的 Event 在节奏播放完成, 被打断或被合并时置位
+        """
+        with self.condition:
+            for entry in self.queue + ([self.current] if self.current is not None else []):
+                if entry[3].name == pattern.name and entry[0] <= -priority:
+                    return entry[4]
+            done = threading.Event()
+            self.counter += 1
+            heapq.heappush(self.queue, (-priority, self.counter, priority, pattern, done))
+            self.condition.notify()
+            return done
+
+    def is_playing(self, pattern: BuzzerPattern):
+        with self.condition:
+            return any(entry[3].name == pattern.name
+                       for entry in self.queue + ([self.current] if self.current is not None else []))
+
+    def silence(self):
+        """
+        清空队列并停止当前节奏
+        """
+        with self.condition:
+            for entry in self.queue:
+                entry[4].set()
+            self.queue.clear()
+            if self.current is not None:
+                self.preempted += 1
+                self.current = None
+            self.condition.notify()
+
+    def drive(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.queue or not self.running)
+                if not self.running:
+                    return
+                entry = self.current = heapq.heappop(self.queue)
+            try:
+                self.play_pattern(entry)
+            finally:
+                self.off()
+                entry[4].set()
+                with self.condition:
+                    if self.current is entry:
+                        self.current = None
+
+    def play_pattern(self, entry):
+        for on_time, off_time in entry[3].steps:
+            for level, duration in ((GPIO.LOW, on_time), (GPIO.HIGH, off_time)):
+                with self.lock:
+                    GPIO.output(self.channel, level)
+                if duration and self.wait_preempted(entry, duration):
+                    return
+
+    def wait_preempted(self, entry, duration):
+        """
+        等待 duration 秒, 有更高优先级的节奏入队或被 silence 时返回 True
+        """
+        deadline = time.monotonic() + duration
+        with self.condition:
+            while self.running and self.current is entry:
+                if self.queue and self.queue[0][0] < entry[0]:
+                    self.preempted += 1
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+            return True
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.driver.join(timeout=1)
+        self.off()
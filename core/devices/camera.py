@@ -0,0 +1,133 @@
+import time
+import cv2 as cv
+from abc import ABC
+from core import backend
+from core.detectors import get_detector
+from core.devices.base import Device
+from core.gpio import GPIO
+from core.recorder import EventRecorder
+from core.video import FaceTracker, MotionGate
+
+
+class Camera(Device, ABC):
+
+    # 高电平为常规模式，低电平为红外模式
+    def __init__(self, device_id, channel, width=640, height=480, framerate=60, file_path='./file/camera',
+                 detect_interval=1, detect_scale=1.0, min_confidence=0.6, motion_gate=False, motion_threshold=0.01,
+                 motion_cooldown=2.0, detector='haar', detector_model=None, record=False):
+        super().__init__(device_id)
+        self.channel = channel
+        self.cap = backend.open_video_capture(0)
+        self.cap.set(cv.CAP_PROP_FPS, framerate)
+        self.cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
+        # 驱动只缓存一帧, 读到的总是最新画面
+        self.cap.set(cv.CAP_PROP_BUFFERSIZE, 1)
+        # 检测器在第一次检测时才加载模型
+        self.detector = get_detector(detector, detector_model)
+        self.file_path = file_path
+        self.infrared_mode = 1
+        # detect_interval > 1 或 detect_scale < 1 时启用先检测后跟踪
+        self.tracker = None
+        if detect_interval > 1 or detect_scale < 1:
+            self.tracker = FaceTracker(self.full_detect, detect_interval, detect_scale, min_confidence)
+        # 画面静止时跳过人脸检测
+        self.motion_gate = None
+        if motion_gate:
+            self.motion_gate = MotionGate(motion_threshold, cooldown=motion_cooldown)
+        self.last_faces = ()
+        self.frame_bus = None
+        # 事件录像, 录像文件保存在 file_path 下
+        self.recorder = EventRecorder(file_path) if record else None
+        GPIO.setup(channel, GPIO.OUT)
+        GPIO.output(channel, GPIO.HIGH)
+
+    def is_infrared_on(self):
+        return self.infrared_mode == 0
+
+    def turn_on_infrared(self):
+        if self.infrared_mode == 1:
+            self.infrared_mode = 0
+            GPIO.output(self.channel, GPIO.LOW)
+            print('摄像头红外模式:on')
+
+    def turn_off_infrared(self):
+        if self.infrared_mode == 0:
+            self.infrared_mode = 1
+            GPIO.output(self.channel, GPIO.HIGH)
+            print('摄像头红外模式:off')
+
+    def enable_frame_bus(self, name='pi-bot-camera', slots=8, max_consumers=4):
+        """
+        将采集到的帧发布到共享内存帧总线, 供其他进程零拷贝读取
+        """
+        from core.framebus import FrameBus
+        shape = (int(self.cap.get(cv.CAP_PROP_FRAME_HEIGHT)), int(self.cap.get(cv.CAP_PROP_FRAME_WIDTH)), 3)
+        self.frame_bus = FrameBus(name, shape, slots, max_consumers)
+        return self.frame_bus
+
+    def read_frame(self):
+        ret, frame = self.cap.read()
+        if ret:
+            frame = cv.flip(frame, 1)
+            if self.frame_bus is not None:
+                self.frame_bus.publish(frame)
+            if self.recorder is not None:
+                self.recorder.add_frame(frame)
+        return ret, frame
+
+    def capture(self):
+        ret, frame = self.read_frame()
+        if ret:
+            self.face_detection(frame)
+            self.show(frame)
+        time.sleep(self.cap.get(cv.CAP_PROP_FPS) / 1000)
+        return frame
+
+    def show(self, frame):
+        cv.imshow("frame", frame)
+        if cv.waitKey(1) == ord('q'):
+            self.off()
+
+    def stop(self):
+        self.off()
+
+    def off(self):
+        self.cap.release()
+        if self.frame_bus is not None:
+            self.frame_bus.close()
+            self.frame_bus = None
+        if self.recorder is not None:
+            self.recorder.stop()
+
+    def set_presence_sensor(self, body_infrared_sensor):
+        """
+        人体红外传感器报告有人时, 即使画面静止也运行检测
+        """
+        if self.motion_gate is not None:
+            self.motion_gate.presence = body_infrared_sensor.detection
+
+    def detect_faces(self, frame):
+        gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+        if self.motion_gate is not None and not self.motion_gate.check(gray):
+            # 画面没有变化, 沿用上次的结果
+            return self.last_faces
+        if self.tracker is not None:
+            faces = self.tracker.update(gray)
+        else:
+            faces = self.full_detect(gray)
+        self.last_faces = faces
+        return faces
+
+    def full_detect(self, gray, min_size=(32, 32)):
+        return self.detector.detect(gray, min_size)
+
+    @staticmethod
+    def annotate(frame, faces):
+        for x, y, w, h in faces:
+            cv.rectangle(frame, pt1=(x, y), pt2=(x + w, y + h), color=[0, 0, 255], thickness=2)
+            cv.circle(frame, center=(x + w // 2, y + h // 2), radius=w // 2, color=[0, 255, 0], thickness=2)
+        return frame
+
+    def face_detection(self, frame):
+        return self.annotate(frame, self.detect_faces(frame))
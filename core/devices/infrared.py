@@ -0,0 +1,25 @@
+from abc import ABC
+from lib.enums import InputMode
+from core.devices.base import Device, EdgeInput
+from core.gpio import GPIO
+
+
+class BodyInfraredSensor(Device, ABC):
+
+    def __init__(self, device_id, channel, input_mode=InputMode.INTERRUPT, bouncetime=200):
+        super().__init__(device_id)
+        self.channel = channel
+        GPIO.setup(channel, GPIO.IN)
+        self.input = EdgeInput(channel, GPIO.HIGH, input_mode, bouncetime)
+
+    def detection(self):
+        return GPIO.input(self.channel)
+
+    def wait_for_presence(self, timeout=None):
+        """
+        阻塞直到检测到人体
+        """
+        return self.input.wait_for(True, timeout)
+
+    def wait_for_absence(self, timeout=None):
+        return self.input.wait_for(False, timeout)
@@ -0,0 +1,322 @@
+import datetime
+import threading
+import time
+from abc import ABC
+from core.devices.base import Device
+from core.gpio import GPIO
+
+
+# 数码管
+class NixieTube(Device, ABC):
+    """
+    1，2，3，4 gpio控制第几个数字发光，dp控制点
+    a-g 控制显示内容
+
+       __A__
+      |     |    |  0 ->  011 1111 -> 0x3f
+    F |     | B  |  1 ->  010 0001 -> 0x21
+      |__G__|    |  2 ->  111 0110 -> 0x76
+      |     |    |  4 ->  ...
+    E |     | C  |        ...
+      |__D__| DP |  9 ->  ...      -> 0x5f
+
+    后台线程按帧缓冲 (4 个段码) 逐位扫描, 只写入与上一位不同的段; 显示方法设置内容后立即返回
+    """
+
+    alphabet = {
+        '0': (0, 0, 0, 0, 0, 0, 1, 1),
+        '1': (1, 0, 0, 1, 1, 1, 1, 1),
+        '2': (0, 0, 1, 0, 0, 1, 0, 1),
+        '3': (0, 0, 0, 0, 1, 1, 0, 1),
+        '4': (1, 0, 0, 1, 1, 0, 0, 1),
+        '5': (0, 1, 0, 0, 1, 0, 0, 1),
+        '6': (0, 1, 0, 0, 0, 0, 0, 1),
+        '7': (0, 0, 0, 1, 1, 1, 1, 1),
+        '8': (0, 0, 0, 0, 0, 0, 0, 1),
+        '9': (0, 0, 0, 0, 1, 0, 0, 1),
+        'A': (0, 0, 0, 1, 0, 0, 0, 1),
+        'B': (1, 1, 0, 0, 0, 0, 0, 1),
+        'C': (0, 1, 1, 0, 0, 0, 1, 1),
+        'D': (1, 0, 0, 0, 0, 1, 0, 1),
+        'E': (0, 1, 1, 0, 0, 0, 0, 1),
+        'F': (0, 1, 1, 1, 0, 0, 0, 1),
+        'G': (0, 1, 0, 0, 0, 0, 1, 1),
+        'H': (1, 0, 0, 1, 0, 0, 0, 1),
+        'I': (0, 0, 0, 0, 1, 1, 1, 1),
+        'J': (0, 1, 1, 1, 0, 0, 0, 1),
+        'K': (0, 1, 0, 1, 0, 0, 0, 1),
+        'L': (1, 1, 1, 0, 0, 0, 1, 1),
+        'M': (0, 0, 0, 1, 0, 0, 1, 1),
+        'N': (1, 1, 0, 1, 0, 1, 0, 1),
+        'O': (1, 1, 0, 0, 0, 1, 0, 1),
+        'P': (0, 0, 1, 1, 0, 0, 0, 1),
+        'Q': (0, 0, 0, 1, 1, 0, 0, 1),
+        'R': (0, 1, 1, 1, 0, 0, 1, 1),
+        'S': (0, 1, 1, 0, 1, 1, 0, 1),
+        'T': (1, 1, 1, 0, 0, 0, 0, 1),
+        'U': (1, 0, 0, 0, 0, 0, 1, 1),
+        'V': (1, 1, 0, 0, 0, 1, 1, 1),
+        'W': (1, 0, 0, 0, 0, 0, 0, 1),
+        'X': (1, 1, 0, 1, 1, 0, 0, 1),
+        'Y': (1, 0, 0, 0, 1, 0, 0, 1),
+        'Z': (1, 0, 1, 0, 0, 1, 0, 1),
+        ' ': (1, 1, 1, 1, 1, 1, 1, 1),
+        '-': (1, 1, 1, 1, 1, 1, 0, 1),
+        '|': (1, 1, 1, 1, 0, 0, 1, 1),
+        '^': (1, 1, 1, 0, 0, 1, 0, 1),
+        '%': (1, 1, 1, 1, 0, 1, 0, 1)
+    }
+
+    refresh_time = 0.0005
+
+    # 时间等动态内容的刷新间隔
+    source_interval = 0.5
+
+    def __init__(self, device_id, channel_1, channel_2, channel_3, channel_4,
+                 channel_a, channel_b, channel_c, channel_d, channel_e, channel_f, channel_g, channel_dp):
+        super().__init__(device_id)
+        self.sequence = [channel_1, channel_2, channel_3, channel_4]
+        self.channels = [channel_a, channel_b, channel_c, channel_d,
+                         channel_e, channel_f, channel_g, channel_dp]
+        self.all_channels = [channel_1, channel_2, channel_3, channel_4,
+                             channel_a, channel_b, channel_c, channel_d,
+                             channel_e, channel_f, channel_g, channel_dp]
+        GPIO.setup(self.all_channels, GPIO.OUT)
+        GPIO.output(self.all_channels, GPIO.LOW)
+        self.condition = threading.Condition()
+        # 播放列表, 每项为 (帧或返回帧的函数, 显示秒数), 秒数为 None 时一直显示
+        self.playlist = []
+        self.play_index = 0
+        self.item_until = 0.0
+        self.source_at = 0.0
+        self.frame = None
+        self.done = threading.Event()
+        self.done.set()
+        # 当前写入的段码与点亮的位
+        self.segment_mask = BLANK
+        self.active_digit = None
+        self.port_writes = 0
+        self.stopped = threading.Event()
+        self.refresher = None
+
+    def setup(self):
+        if self.refresher is None:
+            self.refresher = threading.Thread(target=self.refresh_loop, name='nixie-refresh', daemon=True)
+            self.refresher.start()
+        self.play([(self.cells_frame([(8, False)] * 4), 1)])
+
+    def stop(self):
+        self.stopped.set()
+        with self.condition:
+            self.condition.notify_all()
+
+    @classmethod
+    def mask(cls, c, has_dot=False):
+        val = str(c)
+        if not val.isnumeric():
+            val = val.upper()
+        mask = SEGMENT_MASKS.get(val, BLANK)
+        return mask & ~DOT_BIT if has_dot else mask
+
+    @classmethod
+    def cells_frame(cls, cells):
+        return tuple(cls.mask(c, has_dot) for c, has_dot in cells)
+
+    def play(self, playlist):
+        """
+        替换当前显示内容并立即返回, 返回播放列表的总时长
+        """
+        with self.condition:
+            self.playlist = list(playlist)
+            self.play_index = -1
+            self.item_until = 0.0
+            self.done.clear()
+            self.condition.notify_all()
+        return sum(duration or 0 for source, duration in self.playlist)
+
+    def wait(self, timeout=None):
+        """
+        等待播放列表结束
+        """
+        return self.done.wait(timeout)
+
+    def current_frame(self, now):
+        with self.condition:
+            if self.play_index < len(self.playlist) and now >= self.item_until:
+                self.play_index += 1
+                if self.play_index >= len(self.playlist):
+                    self.frame = None
+                    self.playlist = []
+                    self.done.set()
+                    return None
+                source, duration = self.playlist[self.play_index]
+                self.item_until = float('inf') if duration is None else now + duration
+                self.source_at = 0.0
+            if self.play_index >= len(self.playlist):
+                return None
+            source = self.playlist[self.play_index][0]
+            if callable(source):
+                if now - self.source_at >= self.source_interval:
+                    self.frame = source()
+                    self.source_at = now
+            else:
+                self.frame = source
+            return self.frame
+
+    def refresh_loop(self):
+        frame = None
+        while not self.stopped.is_set():
+            frame = self.current_frame(time.monotonic())
+            if frame is None:
+                self.blank()
+                with self.condition:
+                    self.condition.wait_for(lambda: self.stopped.is_set() or self.playlist, 1.0)
+                continue
+            # 每轮扫描 4 位后再检查内容是否变化
+            for digit in range(4):
+                self.show_digit(digit, frame[digit])
+                time.sleep(self.refresh_time)
+        self.blank()
+
+    def show_digit(self, digit, mask):
+        if self.active_digit is not None:
+            GPIO.output(self.sequence[self.active_digit], GPIO.LOW)
+            self.active_digit = None
+            self.port_writes += 1
+        changed = CHANGED_SEGMENTS[mask ^ self.segment_mask]
+        if changed:
+            GPIO.output([self.channels[i] for i in changed], [(mask >> i) & 1 for i in changed])
+            self.segment_mask = mask
+            self.port_writes += 1
+        if mask != BLANK:
+            GPIO.output(self.sequence[digit], GPIO.HIGH)
+            self.active_digit = digit
+            self.port_writes += 1
+
+    def blank(self):
+        GPIO.output(self.all_channels, GPIO.LOW)
+        self.active_digit = None
+        self.segment_mask = 0
+
+    def display_character(self, sequence, c, has_dot=False):
+        """
+        只点亮一位
+        """
+        frame = [BLANK] * 4
+        frame[sequence] = self.mask(c, has_dot)
+        self.play([(tuple(frame), None)])
+
+    def display_refresh(self, sequence, c, has_dot=False):
+        self.display_character(sequence, c, has_dot)
+
+    def display_content(self, content, interval=0):
+        content_len = len(str(content).replace('.', ''))
+        if interval == 0 and content_len > 4:
+            interval = 0.7
+        else:
+            interval = 5.0
+        if content_len > 4:
+            return self.display_long_str(content, interval)
+        else:
+            return self.display_str(content, interval)
+
+    @staticmethod
+    def parse_str(val):
+        val = str(val)
+        no_dot_val = val.replace('.', '')
+        fill_count = 4 - len(no_dot_val)
+        val = val + '*' * fill_count
+        val_mapping = [[], [], [], []]
+        i = 0
+        dot_count = 0
+        while i < len(val):
+            if dot_count >= 4:
+                break
+            if i < len(val) - 1 and val[i + 1] == '.':
+                val_mapping[i - dot_count] = [val[i], True]
+                dot_count += 1
+                i += 2
+            else:
+                val_mapping[i - dot_count] = [val[i], False]
+                i += 1
+        return val_mapping
+
+    def display_str(self, val, interval=5.0):
+        return self.display_val(self.parse_str(val), interval)
+
+    def display_val(self, val_mapping: list, interval=5.0):
+        return self.play([(self.cells_frame(val_mapping), interval)])
+
+    def long_str_frames(self, val):
+        vals = '*' * 4 + str(val)
+        fill_num = len(vals.replace('.', '')) % 4
+        vals = vals + '*' * (fill_num + 4)
+        frames = []
+        i = 0
+        while i < len(vals) - 4:
+            val_mapping = [[], [], [], []]
+            end_val_dot = False
+            offset = 5
+            if i % 4 != 0 or i != 0:
+                offset = 4
+            if (i + offset) < len(vals) and vals[i + offset] == '.':
+                end_val_dot = True
+            temp_val = vals[i: i + 4]
+            dot_num = temp_val.count('.')
+            temp_val = vals[i: i + 4 + dot_num]
+            if temp_val[len(temp_val) - 1] == '.':
+                temp_val = vals[i: i + 5 + dot_num]
+            j = 0
+            dot_count = 0
+            while j < len(temp_val):
+                if dot_count >= 4:
+                    break
+                if j < len(temp_val) - 1 and temp_val[j + 1] == '.':
+                    val_mapping[j - dot_count] = [temp_val[j], True]
+                    j += 2
+                    dot_count += 1
+                else:
+                    val_mapping[j - dot_count] = [temp_val[j], False]
+                    j += 1
+            if end_val_dot:
+                val_mapping[3][1] = True
+            if val_mapping[0][1]:
+                i += 2
+            else:
+                i += 1
+            frames.append(self.cells_frame(val_mapping))
+        return frames
+
+    def display_long_str(self, val, interval=0.7):
+        return self.play([(frame, interval) for frame in self.long_str_frames(val)])
+
+    def time_frame(self):
+        now = datetime.datetime.now()
+        return self.cells_frame([(now.hour // 10, False), (now.hour % 10, True),
+                                 (now.minute // 10, False), (now.minute % 10, False)])
+
+    def display_time(self, interval):
+        return self.play([(self.time_frame, interval)])
+
+    def display_symbol_num(self, num, symbol, interval):
+        decade = int(num / 10)
+        single_digit = int(num % 10)
+        decimal = int((num - (single_digit + decade * 10)) * 10)
+        return self.play([(self.cells_frame([(decade, False), (single_digit, True), (decimal, False),
+                                             (symbol, False)]), interval)])
+
+    def display_warning(self, interval, cycle):
+        warning = self.cells_frame([(8, False)] * 4)
+        blank = (BLANK,) * 4
+        return self.play([(warning, 0.3), (blank, interval)] * cycle)
+
+
+# 段码: bit0-6 为 a-g, bit7 为小数点, 位值即输出电平 (低电平点亮)
+SEGMENT_MASKS = {c: sum(level << i for i, level in enumerate(states)) for c, states in NixieTube.alphabet.items()}
+
+BLANK = SEGMENT_MASKS[' ']
+
+DOT_BIT = 1 << 7
+
+# 两个段码异或后需要重新写入的段
+CHANGED_SEGMENTS = tuple(tuple(i for i in range(8) if diff >> i & 1) for diff in range(256))
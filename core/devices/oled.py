@@ -0,0 +1,276 @@
+import datetime
+import hashlib
+import os
+import threading
+import time
+from abc import ABC
+from collections import OrderedDict
+from pathlib import Path
+from PIL import ImageFont, Image, ImageDraw
+from luma.core.interface.serial import i2c
+from luma.core.sprite_system import framerate_regulator
+from luma.oled.device import ssd1306
+from core import backend
+from core.devices.base import Device
+from core.i2c import open_bus
+from lib.enums import I2cPriority
+from lib.utils import TimeUtils, WeatherUtils
+
+
+class TextRasterCache:
+    """
+    文字点阵缓存 (LRU)
+    字符串与单个字形渲染为 1 位图像后缓存, 绘制页面时直接贴图, 不再每帧调用 draw.text
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.rasters = OrderedDict()
+        self.advances = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, font):
+        key = (text, font)
+        with self.lock:
+            raster = self.rasters.get(key)
+            if raster is not None:
+                self.rasters.move_to_end(key)
+                self.hits += 1
+                return raster
+        raster = self.rasterize(text, font)
+        with self.lock:
+            self.misses += 1
+            self.rasters[key] = raster
+            if len(self.rasters) > self.capacity:
+                self.rasters.popitem(last=False)
+        return raster
+
+    def advance(self, char, font):
+        key = (char, font)
+        width = self.advances.get(key)
+        if width is None:
+            if hasattr(font, 'getlength'):
+                width = font.getlength(char)
+            else:
+                width = font.getsize(char)[0]
+            self.advances[key] = width
+        return width
+
+    @staticmethod
+    def rasterize(text, font):
+        if hasattr(font, 'getbbox'):
+            right, bottom = font.getbbox(text)[2:]
+        else:
+            right, bottom = font.getsize(text)
+        image = Image.new('1', (max(1, right), max(1, bottom)))
+        ImageDraw.Draw(image).text((0, 0), text, fill=1, font=font)
+        return image
+
+
+class OledDisplay(Device, ABC):
+
+    # 字体缓存, 同一字体文件与字号只加载一次
+    fonts = {}
+
+    fonts_lock = threading.Lock()
+
+    def __init__(self, device_id, port=1, address=0x3c, width=128, height=32, fps=30, font=None,
+                 text_cache_size=256, cache_dir='./file/cache', background_setup=True):
+        super().__init__(device_id)
+        # 1796236
+        if font is None:
+            font = self.load_default_font()
+        self.fount = font
+        self.port = port
+        self.address = address
+        self.width = width
+        self.height = height
+        # 经过总线仲裁, 帧数据按 32 字节分块发送, 块之间传感器读取可以插队
+        self.serial = i2c(bus=open_bus(port, device_id.value, I2cPriority.DISPLAY), port=port, address=address)
+        self.regulator = framerate_regulator(fps=fps)
+        self.device = ssd1306(self.serial, width=width, height=height)
+        self.text_cache = TextRasterCache(text_cache_size)
+        # 上一次发送到显存的数据, 按 SSD1306 页 (8 行) 组织
+        self.last_buffer = None
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+        # 开机动画帧的磁盘缓存目录
+        self.cache_dir = cache_dir
+        self.background_setup = background_setup
+        self.setup_done = threading.Event()
+        self.logo_skipped = threading.Event()
+
+    @classmethod
+    def load_font(cls, path, size):
+        key = (path, size)
+        with cls.fonts_lock:
+            font = cls.fonts.get(key)
+            if font is None:
+                font = ImageFont.truetype(path, size)
+                cls.fonts[key] = font
+            return font
+
+    @classmethod
+    def load_default_font(cls):
+        try:
+            return cls.load_font('./resource/msyhl.ttc', 12)
+        except OSError:
+            # 模拟环境中可能没有微软雅黑字体
+            if not backend.is_simulated():
+                raise
+            return ImageFont.load_default()
+
+    def setup(self):
+        if self.background_setup:
+            threading.Thread(target=self.play_logo, name='oled-logo', daemon=True).start()
+        else:
+            self.play_logo()
+
+    def skip_logo(self):
+        self.logo_skipped.set()
+
+    def play_logo(self, duration=5):
+        """
+        播放开机动画, 至少转一圈, 超过 duration 秒或调用 skip_logo 后结束
+        """
+        try:
+            frames = self.logo_frames()
+            start_time = time.time()
+            while time.time() - start_time <= duration and not self.logo_skipped.is_set():
+                for frame in frames:
+                    if self.logo_skipped.is_set():
+                        break
+                    with self.regulator:
+                        self.show(frame)
+        finally:
+            self.setup_done.set()
+
+    def logo_frames(self, step=2):
+        """
+        开机动画帧 (设备模式的 1 位图像)
+        首次生成后按 logo 文件哈希与屏幕尺寸缓存到磁盘, 之后开机直接读取
+        """
+        img_path = Path(__file__).resolve().parents[2].joinpath('resource', 'pi_logo.png')
+        logo_bytes = img_path.read_bytes()
+        key = hashlib.sha1(logo_bytes).hexdigest()[:16]
+        size = self.device.size
+        cache_file = Path(self.cache_dir).joinpath('logo-%s-%dx%d-%s-%d.bin' % (key, size[0], size[1],
+                                                                                self.device.mode, step))
+        frame_bytes = len(Image.new(self.device.mode, size).tobytes())
+        count = len(range(0, 360, step))
+        if cache_file.exists():
+            data = cache_file.read_bytes()
+            if len(data) == frame_bytes * count:
+                return [Image.frombytes(self.device.mode, size, data[i * frame_bytes:(i + 1) * frame_bytes])
+                        for i in range(count)]
+        logo = Image.open(str(img_path)).convert('RGBA')
+        fff = Image.new('RGBA', logo.size, (255,) * 4)
+        background = Image.new("RGBA", size, "white")
+        posn = ((self.device.width - logo.width) // 2, 0)
+        frames = []
+        for angle in range(0, 360, step):
+            rot = logo.rotate(angle, resample=Image.BILINEAR)
+            img = Image.composite(rot, fff, rot)
+            background.paste(img, posn)
+            frames.append(background.convert(self.device.mode))
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix('.tmp')
+            tmp_file.write_bytes(b''.join(frame.tobytes() for frame in frames))
+            os.replace(str(tmp_file), str(cache_file))
+        except OSError as e:
+            print('开机动画缓存写入失败:', e)
+        return frames
+
+    def invalidate(self):
+        """
+        绕过 show 直接写显存后调用, 下一帧整屏发送
+        """
+        self.last_buffer = None
+
+    def show(self, frame):
+        """
+        只发送与上一帧不同的区域
+        按页比较, 每个变化的页只发送首尾变化列之间的数据
+        """
+        pages = self.device.height // 8
+        width = self.device.width
+        # 顺时针旋转后每行对应一列像素, 每个字节正好是一页中一列的 8 个点 (高位在下)
+        data = frame.transpose(Image.ROTATE_270).tobytes()
+        buffer = [data[pages - 1 - page::pages] for page in range(pages)]
+        col_offset = getattr(self.device, '_colstart', 0)
+        self.lock.acquire()
+        try:
+            for page in range(pages):
+                row = buffer[page]
+                last_row = self.last_buffer[page] if self.last_buffer else None
+                if row == last_row:
+                    self.bytes_saved += width
+                    continue
+                first, last = 0, width - 1
+                if last_row is not None:
+                    while row[first] == last_row[first]:
+                        first += 1
+                    while row[last] == last_row[last]:
+                        last -= 1
+                self.device.command(0x21, col_offset + first, col_offset + last, 0x22, page, page)
+                self.device.data(list(row[first:last + 1]))
+                self.bytes_sent += last - first + 1 + 6
+                self.bytes_saved += width - (last - first + 1)
+            self.last_buffer = buffer
+        finally:
+            self.lock.release()
+
+    def new_frame(self):
+        return Image.new(self.device.mode, self.device.size)
+
+    def blit_text(self, frame, xy, text, font=None, per_glyph=False):
+        """
+        将缓存的文字点阵贴到画面上
+        per_glyph 为 True 时逐字贴图, 用于每次都变化但字符集很小的内容 (如时分秒)
+        """
+        font = font or self.fount
+        x, y = xy
+        if not per_glyph:
+            raster = self.text_cache.get(text, font)
+            frame.paste(raster, (int(x), int(y)), raster)
+            return
+        # 按浮点累加字宽, 贴图时再取整, 避免逐字截断造成与 draw.text 的偏差
+        for char in text:
+            raster = self.text_cache.get(char, font)
+            frame.paste(raster, (round(x), round(y)), raster)
+            x += self.text_cache.advance(char, font)
+
+    def display_time(self, t: datetime.datetime):
+        date = t.strftime('%Y年%m月%d日')
+        times = t.strftime('%H:%M:%S')
+        week = t.strftime('%w')
+        frame = self.new_frame()
+        self.blit_text(frame, (2, 0), date + ' ' + TimeUtils.weeks[int(week)])
+        self.blit_text(frame, (40, 15), times, per_glyph=True)
+        self.show(frame)
+
+    def display_weather(self):
+        frame = self.new_frame()
+        if WeatherUtils.has_data:
+            self.blit_text(frame, (2, 0), WeatherUtils.province + ',' + WeatherUtils.city + ':'
+                           + WeatherUtils.temperature + '℃,'
+                           + WeatherUtils.weather)
+            self.blit_text(frame, (2, 15), '湿度:' + WeatherUtils.humidity + '%,'
+                           + WeatherUtils.wind_direction + '风,'
+                           + WeatherUtils.wind_power + '级')
+        else:
+            font = self.load_font('./resource/fontawesome-webfont.ttf', self.device.height - 10)
+            w, h = self.text_cache.get('\uf05a', font).size
+            left = (self.device.width - w) / 2
+            top = (self.device.height - h) / 2
+            self.blit_text(frame, (left, top), '\uf05a', font)
+        self.show(frame)
+
+    def display_temperature(self, temperature, humidity):
+        frame = self.new_frame()
+        self.blit_text(frame, (2, 0), '室内温度: ' + str(temperature) + ' ℃')
+        self.blit_text(frame, (2, 15), '室内湿度: ' + str(humidity) + ' %RH')
+        self.show(frame)
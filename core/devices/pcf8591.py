@@ -0,0 +1,140 @@
+import threading
+import time
+from abc import ABC
+from array import array
+from core import i2c
+from core.devices.base import Device
+from lib.enums import I2cPriority
+
+# 控制字: bit6 模拟输出使能, bit2 自动递增, bit0-1 通道
+ANALOG_OUTPUT = 0x40
+
+AUTO_INCREMENT = 0x04
+
+CHANNELS = 4
+
+
+class PCF8591(Device, ABC):
+    """
+    PCF8591 模数转换
+    芯片是流水线式的, 写入控制字后读到的第一个字节是上一次转换的结果, 这里都会丢弃
+    sample_rate 不为空时 setup 启动 AdcSampler, 以一次块读取采集全部通道, sample() 直接返回最新采样
+    """
+
+    def __init__(self, device_id, bus=1, addr=0x48, sample_rate=None, capacity=256):
+        super().__init__(device_id)
+        self.addr = addr
+        self.smbus = i2c.open_bus(bus, device_id.value, I2cPriority.SENSOR)
+        self.sample_rate = sample_rate
+        self.capacity = capacity
+        self.sampler = None
+
+    def setup(self):
+        if self.sample_rate and self.sampler is None:
+            self.sampler = AdcSampler(self, self.sample_rate, self.capacity)
+            self.sampler.start()
+
+    def read(self, channel):
+        with self.lock:
+            return self.smbus.read_i2c_block_data(self.addr, ANALOG_OUTPUT | (channel & 0x03), 2)[1]
+
+    def read_all(self):
+        """
+        自动递增模式下一次读取 4 个通道
+        """
+        with self.lock:
+            return self.smbus.read_i2c_block_data(self.addr, ANALOG_OUTPUT | AUTO_INCREMENT, CHANNELS + 1)[1:]
+
+    def sample(self, channel):
+        """
+        采样器运行时返回最新采样, 否则直接读取
+        """
+        if self.sampler is not None and self.sampler.count:
+            return self.sampler.latest(channel)
+        return self.read(channel)
+
+    def write(self, val):
+        # 将字符串值移动到temp
+        temp = val
+        # 将字符串改为整数类型
+        temp = int(temp)
+        # 写入字节数据，将数字值转化成模拟值从 AOUT 输出
+        with self.lock:
+            self.smbus.write_byte_data(self.addr, ANALOG_OUTPUT, temp)
+
+    def stop(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+
+
+class AdcSampler:
+    """
+    按固定频率采集 PCF8591 全部通道, 每个通道一个 array 环形缓冲
+    读取方无需访问总线, 多个设备 (光敏电阻, AO 模式的烟雾传感器) 共用一次采集
+    """
+
+    def __init__(self, adc: PCF8591, rate=20, capacity=256):
+        self.adc = adc
+        self.interval = 1 / rate
+        self.capacity = capacity
+        self.buffers = [array('B', bytes(capacity)) for channel in range(CHANNELS)]
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.count = 0
+        self.errors = 0
+        self.overruns = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.sample_loop, name='adc-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def sample_loop(self):
+        next_time = time.monotonic()
+        while not self.stopped.is_set():
+            try:
+                self.append(self.adc.read_all())
+            except OSError as e:
+                self.errors += 1
+                print('ADC 读取失败:', e)
+            next_time += self.interval
+            delay = next_time - time.monotonic()
+            if delay < 0:
+                # 跟不上采样频率时从当前时间重新计时
+                self.overruns += 1
+                next_time = time.monotonic()
+                delay = 0
+            self.stopped.wait(delay)
+
+    def append(self, values, timestamp=None):
+        index = self.count % self.capacity
+        for channel in range(CHANNELS):
+            self.buffers[channel][index] = values[channel]
+        self.timestamps[index] = time.time() if timestamp is None else timestamp
+        # 数据写入后再更新计数, 读取方不会读到写了一半的采样
+        self.count += 1
+
+    def latest(self, channel):
+        return self.buffers[channel][(self.count - 1) % self.capacity]
+
+    def values(self, channel, count=None):
+        """
+        最近 count 个采样, 按时间先后排列
+        """
+        total = self.count
+        count = min(total, self.capacity, count or self.capacity)
+        start = (total - count) % self.capacity
+        buffer = self.buffers[channel]
+        if start + count <= self.capacity:
+            return buffer[start:start + count]
+        return buffer[start:] + buffer[:count - (self.capacity - start)]
+
+    def mean(self, channel, count=None):
+        values = self.values(channel, count)
+        return sum(values) / len(values) if values else None
+
+    def stats(self):
+        return {'samples': self.count, 'errors': self.errors, 'overruns': self.overruns}
@@ -0,0 +1,52 @@
+import time
+from abc import ABC
+from lib.enums import Constants, InputMode
+from core.devices.base import Device, EdgeInput
+from core.gpio import GPIO
+
+
+class Smog(Device, ABC):
+
+    def __init__(self, device_id, channel, mode, adc=None, threshold=0, input_mode=InputMode.INTERRUPT,
+                 bouncetime=200):
+        super().__init__(device_id)
+        self.channel = channel
+        self.mode = mode
+        self.adc = adc
+        self.threshold = threshold
+        self.input = None
+        if mode == Constants.DO_TYPE:
+            GPIO.setup(channel, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+            # DO 输出低电平表示检测到烟雾
+            self.input = EdgeInput(channel, GPIO.LOW, input_mode, bouncetime)
+
+    def has_smoke(self):
+        self.lock.acquire()
+        if self.mode == Constants.DO_TYPE:
+            val = not GPIO.input(self.channel)
+        else:
+            val = self.adc.sample(self.channel) >= self.threshold
+        self.lock.release()
+        return val
+
+    def wait_for_smoke(self, timeout=None, poll_interval=0.05):
+        """
+        阻塞直到检测到烟雾, AO 模式只能轮询
+        """
+        if self.input is not None:
+            return self.input.wait_for(True, timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.has_smoke():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def get_concentration(self):
+        self.lock.acquire()
+        if self.mode == Constants.DO_TYPE:
+            val = '当前DO模式无法读取数值'
+        else:
+            val = self.adc.sample(self.channel)
+        self.lock.release()
+        return val
@@ -0,0 +1,18 @@
+import threading
+import simpleaudio as audio
+from abc import ABC
+from core.devices.base import Device
+
+
+class LoudSpeakerBox(Device, ABC):
+
+    def __init__(self, device_id):
+        super().__init__(device_id)
+        self.lock = threading.RLock()
+
+    def play_file(self, filename):
+        self.lock.acquire()
+        wave_obj = audio.WaveObject.from_wave_file(filename)
+        play_obj = wave_obj.play()
+        play_obj.wait_done()
+        self.lock.release()
@@ -0,0 +1,96 @@
+import threading
+import time
+from abc import ABC
+from collections import namedtuple
+from lib.enums import ReadingQuality
+from core import backend
+from core.devices.base import Device
+
+
+ThermometerReading = namedtuple('ThermometerReading', ['timestamp', 'humidity', 'temperature', 'quality'])
+
+
+class Thermometer(Device, ABC):
+    """
+    温湿度传感器 (DHT11)
+    后台线程每 interval 秒读取一次, 读数以不可变快照发布, 读取方无锁并立即返回
+    超过 max_age 秒未成功读取时快照标记为 STALE
+    """
+
+    # DHT11 两次读取之间至少间隔 2 秒
+    retry_interval = 2.0
+
+    def __init__(self, device_id, channel, interval=5.0, max_age=30.0):
+        super().__init__(device_id)
+        self.channel = channel
+        self.interval = interval
+        self.max_age = max_age
+        self.dht = backend.load_dht()
+        self.reading = ThermometerReading(0.0, None, None, ReadingQuality.MISSING)
+        self.reads = 0
+        self.failures = 0
+        self.stopped = threading.Event()
+        self.sampler = None
+
+    def setup(self):
+        if self.sampler is None:
+            self.sampler = threading.Thread(target=self.sample_loop, name='thermometer-sampler', daemon=True)
+            self.sampler.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def sample_loop(self):
+        while not self.stopped.is_set():
+            ok = self.sample()
+            self.stopped.wait(self.interval if ok else self.retry_interval)
+
+    def sample(self):
+        """
+        读取一次传感器, 成功时发布新的快照
+        """
+        self.lock.acquire()
+        try:
+            humidity, temperature = self.dht.read(self.dht.DHT11, self.channel)
+        except Exception as e:
+            # 驱动可能抛出 RuntimeError 或权限错误, 按读取失败处理, 采样线程继续重试
+            print('温湿度读取失败:', e)
+            humidity, temperature = None, None
+        finally:
+            self.lock.release()
+        self.reads += 1
+        if humidity is None or temperature is None:
+            self.failures += 1
+            return False
+        self.reading = ThermometerReading(time.time(), humidity, temperature, ReadingQuality.OK)
+        return True
+
+    def snapshot(self):
+        reading = self.reading
+        if reading.quality == ReadingQuality.OK and time.time() - reading.timestamp > self.max_age:
+            return reading._replace(quality=ReadingQuality.STALE)
+        return reading
+
+    def current(self):
+        """
+        读数有效时返回快照, 过期或缺失时返回 None
+        """
+        reading = self.snapshot()
+        return reading if reading.quality == ReadingQuality.OK else None
+
+    @property
+    def humidity(self):
+        reading = self.current()
+        return reading.humidity if reading is not None else None
+
+    @property
+    def temperature(self):
+        reading = self.current()
+        return reading.temperature if reading is not None else None
+
+    def detection(self):
+        """
+        (湿度, 温度), 读数过期或缺失时返回 None
+        """
+        reading = self.current()
+        return (reading.humidity, reading.temperature) if reading is not None else None
@@ -0,0 +1,187 @@
+import multiprocessing
+import threading
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 共享内存帧总线
+# 摄像头进程把帧写入 multiprocessing.shared_memory 中预分配的环形槽位, 其他进程 (录像, 第二检测器, 预览)
+# 直接映射为 NumPy 数组读取, 不经过管道也不需要 pickle
+#
+# 共享内存布局 (int64):
+#   [0:6]   槽位数, 高, 宽, 通道数, 最大消费者数, 最新序号
+#   槽位表   每个槽位 [序号, 写入时间 ns], 写入过程中序号为 -1
+#   消费者表 每个消费者 [是否启用, 已读序号]
+#   之后为 槽位数 x 高 x 宽 x 通道数 的 uint8 帧数据
+
+ConsumerHandle = namedtuple('ConsumerHandle', ['name', 'index', 'event'])
+
+FrameView = namedtuple('FrameView', ['seq', 'timestamp', 'frame'])
+
+META_LEN = 6
+
+LATEST = 5
+
+
+def _layout(slots, max_consumers):
+    header_len = META_LEN + slots * 2 + max_consumers * 2
+    # 帧数据按 64 字节对齐
+    data_offset = (header_len * 8 + 63) // 64 * 64
+    return header_len, data_offset
+
+
+def _attach(name):
+    """
+    附加到已存在的共享内存, 避免消费者进程退出时 resource_tracker 将其删除
+    multiprocessing 启动的子进程 (fork 与 spawn) 与发布者共用同一个 resource_tracker, 附加时的登记与发布者的重复,
+    这时不能注销, 否则发布者的登记也被删除; 只有附加时才启动的 resource_tracker 是本进程独有的, 才需要注销
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+        shared = getattr(resource_tracker._resource_tracker, '_fd', None) is not None
+        shm = shared_memory.SharedMemory(name=name)
+        if not shared:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class FrameBusView:
+
+    def __init__(self, shm):
+        self.shm = shm
+        meta = np.ndarray((META_LEN,), dtype=np.int64, buffer=shm.buf)
+        self.slots, height, width, channels, self.max_consumers = (int(v) for v in meta[:5])
+        self.shape = (height, width, channels)
+        header_len, data_offset = _layout(self.slots, self.max_consumers)
+        self.header = np.ndarray((header_len,), dtype=np.int64, buffer=shm.buf)
+        self.slot_table = self.header[META_LEN:META_LEN + self.slots * 2].reshape(self.slots, 2)
+        self.consumer_table = self.header[META_LEN + self.slots * 2:].reshape(self.max_consumers, 2)
+        self.frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=shm.buf, offset=data_offset)
+
+    @property
+    def latest_seq(self):
+        return int(self.header[LATEST])
+
+    def close(self):
+        # 释放对共享内存的引用后才能关闭
+        self.header = self.slot_table = self.consumer_table = self.frames = None
+        self.shm.close()
+
+
+class FrameBus(FrameBusView):
+    """
+    帧总线发布端
+    """
+
+    def __init__(self, name=None, shape=(480, 640, 3), slots=8, max_consumers=4):
+        header_len, data_offset = _layout(slots, max_consumers)
+        size = data_offset + slots * int(np.prod(shape))
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        meta = np.ndarray((header_len,), dtype=np.int64, buffer=shm.buf)
+        meta[:] = 0
+        meta[:5] = (slots, shape[0], shape[1], shape[2] if len(shape) > 2 else 1, max_consumers)
+        del meta
+        super().__init__(shm)
+        self.name = shm.name
+        self.events = [None] * max_consumers
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def create_consumer(self):
+        """
+        分配一个消费者位置, 返回的句柄作为参数传给消费者进程
+        """
+        with self.lock:
+            for index in range(self.max_consumers):
+                if not self.consumer_table[index, 0]:
+                    self.consumer_table[index] = (1, self.latest_seq)
+                    self.events[index] = multiprocessing.Event()
+                    return ConsumerHandle(self.name, index, self.events[index])
+        raise RuntimeError('帧总线消费者已满: %d' % self.max_consumers)
+
+    def release_consumer(self, index):
+        with self.lock:
+            self.consumer_table[index, 0] = 0
+            self.events[index] = None
+
+    def publish(self, frame):
+        if frame.shape != self.shape:
+            frame = frame.reshape(self.shape)
+        with self.lock:
+            seq = self.latest_seq + 1
+            slot = seq % self.slots
+            # 写入期间标记为 -1, 读取方据此判断数据是否完整
+            self.slot_table[slot, 0] = -1
+            np.copyto(self.frames[slot], frame)
+            self.slot_table[slot, 1] = time.time_ns()
+            self.slot_table[slot, 0] = seq
+            self.header[LATEST] = seq
+            self.published += 1
+            events = [event for event in self.events if event is not None]
+        for event in events:
+            event.set()
+        return seq
+
+    def stats(self):
+        latest = self.latest_seq
+        return {
+            'published': self.published,
+            'latest_seq': latest,
+            'consumers': [{'index': index, 'lag': latest - int(self.consumer_table[index, 1])}
+                          for index in range(self.max_consumers) if self.consumer_table[index, 0]],
+        }
+
+    def close(self):
+        shm = self.shm
+        super().close()
+        shm.unlink()
+
+
+class FrameBusConsumer(FrameBusView):
+    """
+    帧总线消费端, 在消费者进程中使用
+    next 返回的帧是共享内存的视图 (零拷贝), 发布端转完一圈后会被覆盖,
+    需要长时间持有时用 is_valid 检查或自行复制
+    """
+
+    def __init__(self, handle: ConsumerHandle, poll_interval=0.005):
+        super().__init__(_attach(handle.name))
+        self.index = handle.index
+        self.event = handle.event
+        self.poll_interval = poll_interval
+        self.last_seq = int(self.consumer_table[self.index, 1])
+
+    def next(self, timeout=None):
+        """
+        等待并返回比上次读取更新的最新一帧, 中间的帧直接跳过
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.event is not None:
+                self.event.clear()
+            latest = self.latest_seq
+            if latest > self.last_seq:
+                slot = latest % self.slots
+                seq, timestamp = (int(v) for v in self.slot_table[slot])
+                if seq == latest:
+                    self.last_seq = seq
+                    self.consumer_table[self.index, 1] = seq
+                    return FrameView(seq, timestamp / 1e9, self.frames[slot])
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            if self.event is not None:
+                self.event.wait(remaining)
+            else:
+                time.sleep(self.poll_interval if remaining is None else min(remaining, self.poll_interval))
+
+    def is_valid(self, view: FrameView):
+        return int(self.slot_table[view.seq % self.slots, 0]) == view.seq
+
+    @property
+    def lag(self):
+        return self.latest_seq - self.last_seq
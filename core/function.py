@@ -1,18 +1,42 @@
 import datetime
+import math
 import threading
 import time
 from abc import abstractmethod, ABC
-from core.devices import NixieTube, Buzzer, Smog, Thermometer, BodyInfraredSensor, OledDisplay, Camera
+from typing import TYPE_CHECKING
+from core.devices.buzzer import SMOKE_ALARM, BODY_WARNING
+from core.scheduler import FunctionScheduler
+from lib.enums import VideoOutput, ReadingQuality, ExecutionMode, BuzzerPriority
+from lib import timeseries
+from lib.timeseries import TimeSeriesStore
+from lib.utils import WeatherUtils
+
+if TYPE_CHECKING:
+    # 只用于类型标注, 驱动模块在创建设备时才导入
+    from core.devices import NixieTube, Buzzer, Smog, Thermometer, BodyInfraredSensor, OledDisplay, Camera
+    from core.recorder import EventRecorder
+    from core.stream import MjpegStreamer
+    from lib.database import BatchWriter
 
 
 class FunctionManager:
 
-    def __init__(self):
+    def __init__(self, mode=ExecutionMode.THREAD, max_workers=2):
         self.function_threads_dict = {}
+        self.mode = mode
+        self.scheduler = None
+        self.stopped = threading.Event()
+        if mode == ExecutionMode.SCHEDULER:
+            self.scheduler = FunctionScheduler(max_workers)
+            self.scheduler.start()
 
     def register(self, function_id, function):
         self.function_threads_dict.update({function_id: function})
-        function.start()
+        # 调度模式下没有声明周期的功能仍使用独立线程
+        if self.scheduler is not None and function.period is not None:
+            self.scheduler.add(function)
+        else:
+            function.start()
 
     def pause_function(self, function_id):
         function = self.function_threads_dict.get(function_id)  # type:Function
@@ -35,12 +59,50 @@ class FunctionManager:
         function.stop()
 
     def stop_all(self):
-        for function in self.function_threads_dict.values():
+        for function in list(self.function_threads_dict.values()):
             function.stop()
-            self.function_threads_dict.pop(function)
+        self.function_threads_dict.clear()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        self.stopped.set()
+
+    def join(self, poll=1.0):
+        """
+        阻塞到 stop_all, 调度线程是守护线程, 主线程需要在这里等待, 否则进程随主线程退出
+        按 poll 秒分段等待, 使主线程能及时响应 KeyboardInterrupt
+        """
+        while not self.stopped.wait(poll):
+            pass
+
+    def stats(self):
+        """
+        调度模式下各功能的执行次数, 抖动与超时统计
+        """
+        return self.scheduler.stats() if self.scheduler is not None else {}
 
 
 class Function(threading.Thread):
+    """
+    功能基类
+    线程模式下在独立线程中循环调用 function()
+    调度模式下由 FunctionScheduler 调用 step() 执行一次不阻塞的迭代, 子类需声明:
+        period   两次执行的间隔 (秒), 为 None 时不支持调度模式; step() 返回数值时作为下次执行的延迟
+        blocking step() 会阻塞在设备 I/O 上, 需要放到线程池执行
+        trigger  EdgeInput, 边沿到来时立即执行
+    没有实现 step() 的子类由默认 step() 执行一次 function(), 并按 blocking 处理
+    """
+
+    period = None
+
+    blocking = False
+
+    trigger = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 默认 step() 中的 function() 可能自带等待, 不能在调度线程或事件循环中执行
+        if cls.step is Function.step:
+            cls.blocking = True
 
     def __init__(self, thread_id):
         super().__init__()
@@ -77,78 +139,192 @@ class Function(threading.Thread):
     def function(self, **kwargs):
         pass
 
+    def step(self):
+        """
+        执行一次 function(), 与线程模式下 run() 的一次迭代相同
+        """
+        self.function()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
 
 class SmokeDetectionFunction(Function, ABC):
 
-    def __init__(self, thread_id, buzzer: Buzzer, smog: Smog):
+    period = 1.0
+
+    def __init__(self, thread_id, buzzer: 'Buzzer', smog: 'Smog', wait_timeout=1.0,
+                 recorder: 'EventRecorder' = None, writer: 'BatchWriter' = None):
         super().__init__(thread_id)
         self.buzzer = buzzer
         self.smog = smog
+        self.recorder = recorder
+        self.writer = writer
+        # 等待烟雾的最长时间, 超时后回到主循环检查暂停与停止
+        self.wait_timeout = wait_timeout
+        self.trigger = smog.input
 
     def function(self):
-        has_smoke = self.smog.has_smoke()
+        has_smoke = self.smog.wait_for_smoke(self.wait_timeout)
         if has_smoke:
-            self.buzzer.cycle()
+            self.alarm()
             time.sleep(3)
 
+    def step(self):
+        if self.smog.has_smoke():
+            self.alarm()
+            return 3.0
+
+    def alarm(self):
+        if self.recorder is not None:
+            self.recorder.trigger('smoke')
+        if self.writer is not None:
+            self.writer.event(self.smog.device_id.value, 'smoke')
+        if self.buzzer is not None:
+            self.buzzer.enqueue(SMOKE_ALARM, BuzzerPriority.ALARM)
+
 
 class NixieDisplayFunction(Function, ABC):
+    """
+    数码管轮播时间, 温度, 湿度与提示语, 数码管由自己的刷新线程扫描, 这里只切换内容
+    """
+
+    period = 10.0
 
-    def __init__(self, thread_id, nixie_tube: NixieTube, thermometer: Thermometer):
+    def __init__(self, thread_id, nixie_tube: 'NixieTube', thermometer: 'Thermometer'):
         super().__init__(thread_id)
         self.nixie_tube = nixie_tube
         self.thermometer = thermometer
+        self.page = 0
 
     def function(self):
-        self.nixie_tube.display_time(10)
-        result = self.thermometer.detection()
-        if result:
-            humidity, temperature = result
-            self.nixie_tube.display_content(str(temperature) + '^', 10)
-            self.nixie_tube.display_content(str(humidity) + '%', 10)
-        else:
-            print("Thermometer data are wrong,skip")
-        self.nixie_tube.display_content('Do not touch')
+        time.sleep(self.step())
+
+    def step(self):
+        """
+        显示下一页, 返回该页的显示时长
+        """
+        page, self.page = self.page, (self.page + 1) % 4
+        if page == 0:
+            return self.nixie_tube.display_time(10)
+        if page in (1, 2):
+            reading = self.thermometer.snapshot()
+            if reading.quality != ReadingQuality.OK:
+                if page == 1:
+                    print("Thermometer data are wrong,skip")
+                return 0
+            if page == 1:
+                return self.nixie_tube.display_content(str(reading.temperature) + '^', 10)
+            return self.nixie_tube.display_content(str(reading.humidity) + '%', 10)
+        return self.nixie_tube.display_content('Do not touch')
 
 
 class BodyDetectionFunction(Function, ABC):
 
-    def __init__(self, thread_id, body_infrared_sensor: BodyInfraredSensor, buzzer: Buzzer):
+    period = 1.0
+
+    def __init__(self, thread_id, body_infrared_sensor: 'BodyInfraredSensor', buzzer: 'Buzzer', wait_timeout=1.0,
+                 recorder: 'EventRecorder' = None, writer: 'BatchWriter' = None):
         super().__init__(thread_id)
         self.body_infrared_sensor = body_infrared_sensor
         self.buzzer = buzzer
+        self.recorder = recorder
+        self.writer = writer
         self.warning_time = 0
+        # 等待人体的最长时间, 超时后回到主循环检查暂停与停止
+        self.wait_timeout = wait_timeout
+        self.trigger = body_infrared_sensor.input
 
     def function(self):
+        if self.body_infrared_sensor.wait_for_presence(self.wait_timeout):
+            self.alarm()
+            time.sleep(1)
+
+    def step(self):
         if self.body_infrared_sensor.detection():
-            print('========警告=======')
-            print('！！！！请勿触碰！！！！\n！！！！有电危险！！！！\n' * 3)
-            print('警告次数:', self.warning_time)
-            self.buzzer.cycle(0.2, 3, 0.5, 10)
-            self.warning_time += 1
-        time.sleep(1)
+            self.alarm()
+
+    def alarm(self):
+        if self.recorder is not None:
+            self.recorder.trigger('body')
+        # 上一次警告还在播放时不重复计数
+        if self.buzzer is not None and self.buzzer.is_playing(BODY_WARNING):
+            return
+        print('========警告=======')
+        print('！！！！请勿触碰！！！！\n！！！！有电危险！！！！\n' * 3)
+        print('警告次数:', self.warning_time)
+        if self.writer is not None:
+            self.writer.event(self.body_infrared_sensor.device_id.value, 'body', str(self.warning_time))
+        if self.buzzer is not None:
+            self.buzzer.enqueue(BODY_WARNING, BuzzerPriority.WARNING)
+        self.warning_time += 1
 
 
 class ThermometerFunction(Function, ABC):
 
-    def __init__(self, thread_id, thermometer: Thermometer):
+    period = 5.0
+
+    def __init__(self, thread_id, thermometer: 'Thermometer', writer: 'BatchWriter' = None,
+                 store: TimeSeriesStore = timeseries.store):
         super().__init__(thread_id)
         self.thermometer = thermometer
+        self.writer = writer
+        self.store = store
+        self.quality = ReadingQuality.OK
+        self.last_timestamp = 0.0
 
     def function(self):
-        self.thermometer.detection()
-        time.sleep(5)
+        self.step()
+        time.sleep(self.period)
+
+    def step(self):
+        # 传感器由 Thermometer 在后台读取, 这里只检查读数是否过期
+        reading = self.thermometer.snapshot()
+        if reading.quality != self.quality:
+            self.quality = reading.quality
+            if reading.quality != ReadingQuality.OK:
+                print('温湿度读数不可用:', reading.quality.value)
+        if reading.quality == ReadingQuality.OK and reading.timestamp > self.last_timestamp:
+            # 每个新读数只记录一次
+            self.last_timestamp = reading.timestamp
+            device = self.thermometer.device_id.value
+            self.store.add(device + '.temperature', reading.temperature, reading.timestamp)
+            self.store.add(device + '.humidity', reading.humidity, reading.timestamp)
+            if self.writer is not None:
+                self.writer.sensor(device, 'temperature', reading.temperature, reading.timestamp)
+                self.writer.sensor(device, 'humidity', reading.humidity, reading.timestamp)
 
 
 class OledDisplayFunction(Function, ABC):
+    """
+    OLED 轮播: 时间 -> 天气 -> 室内温湿度, 每页显示 interval 秒
+    页面只在数据变化时重绘 (时间页每秒一次), 重绘受 OledDisplay.regulator 帧率限制, 其余时间休眠
+    """
+
+    period = 1.0
+
+    blocking = True
 
-    def __init__(self, thread_id, oled_display: OledDisplay, thermometer: Thermometer, interval=15):
+    def __init__(self, thread_id, oled_display: 'OledDisplay', thermometer: 'Thermometer', interval=15,
+                 data_interval=1.0):
         super().__init__(thread_id)
         self.oled_display = oled_display
         self.thermometer = thermometer
         self.interval = interval
+        # 天气与温湿度页检查数据变化的间隔
+        self.data_interval = data_interval
+        self.frames = 0
+        # 调度模式下的轮播状态
+        self.content_index = 0
+        self.page_started = None
+        self.last_key = None
 
     def run(self):
+        # 等待开机动画结束
+        self.oled_display.setup_done.wait()
         content_index = 0
         while self.running.isSet():
             self.status.wait()
@@ -159,43 +335,153 @@ class OledDisplayFunction(Function, ABC):
                 content_index += 1
 
     def function(self, start_time, content_index):
-        tmp_time = datetime.datetime.now().time()
-        while time.time() - start_time <= self.interval:
-            if content_index == 0:
-                now = datetime.datetime.now()
-                if tmp_time == now.time():
-                    continue
-                tmp_time = now.time()
-                self.oled_display.display_time(now)
-            elif content_index == 1:
-                self.oled_display.display_weather()
-            else:
-                self.oled_display.display_temperature(self.thermometer.temperature, self.thermometer.humidity)
+        end_time = start_time + self.interval
+        key = None
+        while self.running.is_set() and time.time() < end_time:
+            key = self.render(content_index, key)
+            now = time.time()
+            time.sleep(max(0.0, min(self.next_tick(content_index, now), end_time) - now))
+
+    def step(self):
+        if not self.oled_display.setup_done.is_set():
+            return 0.1
+        now = time.time()
+        if self.page_started is None:
+            self.page_started = now
+        elif now - self.page_started >= self.interval:
+            self.content_index = 0 if self.content_index >= 2 else self.content_index + 1
+            self.page_started = now
+            self.last_key = None
+        self.last_key = self.render(self.content_index, self.last_key)
+        now = time.time()
+        return max(0.0, min(self.next_tick(self.content_index, now), self.page_started + self.interval) - now)
+
+    def render(self, content_index, last_key=None):
+        """
+        页面数据与上次不同时重绘, 返回本次的页面数据
+        """
+        key = self.page_key(content_index)
+        if key != last_key:
+            with self.oled_display.regulator:
+                self.draw_page(content_index, key)
+            self.frames += 1
+        return key
+
+    def page_key(self, content_index):
+        if content_index == 0:
+            return datetime.datetime.now().replace(microsecond=0)
+        elif content_index == 1:
+            return (WeatherUtils.has_data, WeatherUtils.province, WeatherUtils.city, WeatherUtils.temperature,
+                    WeatherUtils.weather, WeatherUtils.humidity, WeatherUtils.wind_direction,
+                    WeatherUtils.wind_power)
+        else:
+            reading = self.thermometer.snapshot() if self.thermometer is not None else None
+            if reading is not None and reading.quality == ReadingQuality.OK:
+                return reading.temperature, reading.humidity
+            # 温湿度传感器不可用或读数不可用时显示 --
+            return '--', '--'
+
+    def draw_page(self, content_index, key):
+        if content_index == 0:
+            self.oled_display.display_time(key)
+        elif content_index == 1:
+            self.oled_display.display_weather()
+        else:
+            self.oled_display.display_temperature(*key)
+
+    def next_tick(self, content_index, now):
+        if content_index == 0:
+            # 下一个整秒
+            return math.floor(now) + 1
+        return now + self.data_interval
 
 
 class LightingDetectionFunction(Function, ABC):
+    """
+    光照采样, 记录亮度并在光线暗时打开摄像头红外灯; 没有摄像头时只做采样与记录
+    """
 
-    def __init__(self, thread_id, pcf8591, channel, camera: Camera):
+    period = 0.5
+
+    blocking = True
+
+    def __init__(self, thread_id, pcf8591, channel, camera: 'Camera', writer: 'BatchWriter' = None,
+                 store: TimeSeriesStore = timeseries.store):
         super().__init__(thread_id)
         self.pcf8591 = pcf8591
         self.channel = channel
         self.camera = camera
-        self.luminance = self.pcf8591.read(channel)
+        self.writer = writer
+        self.series = store.get(pcf8591.device_id.value + '.luminance')
+        self.luminance = self.pcf8591.sample(channel)
 
     def function(self, **kwargs):
-        self.luminance = self.pcf8591.read(self.channel)
+        self.step()
+        time.sleep(self.period)
+
+    def step(self):
+        # 与 AO 模式的烟雾传感器共用 PCF8591 的采样器
+        self.luminance = self.pcf8591.sample(self.channel)
+        self.series.add(self.luminance)
+        if self.writer is not None:
+            self.writer.sensor(self.pcf8591.device_id.value, 'luminance', self.luminance)
+        if self.camera is None:
+            return
         if self.luminance > 130:
             self.camera.turn_on_infrared()
         else:
             self.camera.turn_off_infrared()
-        time.sleep(0.5)
 
 
 class VideoOutputFunction(Function, ABC):
+    """
+    输出摄像头检测结果, 采集与检测由 CameraPipeline 在独立线程中完成
+    输出到本地窗口, 或由 MjpegStreamer 编码后推流
+    """
 
-    def __init__(self, thread_id, camera: Camera):
+    # 调度模式下 cv.imshow 始终在调度线程中调用
+    period = 1 / 30
+
+    def __init__(self, thread_id, camera: 'Camera', workers=2, ring_size=4, output=VideoOutput.WINDOW,
+                 streamer: 'MjpegStreamer' = None):
         super().__init__(thread_id)
         self.camera = camera
+        self.output = output
+        self.streamer = streamer
+        if output == VideoOutput.MJPEG and streamer is None:
+            from core.stream import MjpegStreamer
+            self.streamer = MjpegStreamer()
+        from core.video import CameraPipeline
+        self.pipeline = CameraPipeline(camera, workers, ring_size)
+        self.subscription = self.pipeline.subscribe()
+
+    def open(self):
+        self.pipeline.start()
+        if self.output == VideoOutput.MJPEG:
+            self.streamer.start()
+
+    def close(self):
+        self.pipeline.stop()
+        if self.output == VideoOutput.MJPEG:
+            self.streamer.stop()
+
+    def run(self):
+        self.open()
+        try:
+            super().run()
+        finally:
+            self.close()
 
     def function(self, **kwargs):
-        self.camera.capture()
+        self.output_result(self.subscription.get(timeout=1))
+
+    def step(self):
+        self.output_result(self.subscription.get(timeout=0))
+
+    def output_result(self, result):
+        if result is None:
+            return
+        if self.output == VideoOutput.MJPEG:
+            self.streamer.publish(result.frame)
+        else:
+            self.camera.show(result.frame)
@@ -1,4 +1,6 @@
-from RPi import GPIO
+from core import backend
+
+GPIO = backend.load_gpio()
 
 # 设置引脚编码
 GPIO.setmode(GPIO.BCM)
@@ -0,0 +1,240 @@
+import itertools
+import os
+import threading
+import time
+
+from core import backend
+from lib.enums import I2cPriority
+
+# I2C 总线仲裁
+# 同一总线上的设备 (OLED, PCF8591) 都通过 BusArbiter 访问总线, 每次事务独占总线
+# 等待中的事务按优先级授权, 传感器读取优先于显示刷新; OLED 的帧数据按 32 字节分块, 传感器最多等待一个块
+# 相同的块读取在等待期间合并为一次总线事务, 按设备统计总线占用, 可以为设备设置占用上限
+
+DEFAULT_FREQUENCY = int(os.environ.get('PI_BOT_I2C_HZ', 100000))
+
+
+class BusAccount:
+    """
+    单个设备的总线占用统计
+    """
+
+    def __init__(self, name, window):
+        self.name = name
+        self.window = window
+        self.budget = None
+        self.transactions = 0
+        self.coalesced = 0
+        self.bytes = 0
+        self.wire_time = 0.0
+        self.busy_time = 0.0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.window_start = time.monotonic()
+        self.window_busy = 0.0
+
+    def record(self, nbytes, wire_time, busy_time, wait_time):
+        self.transactions += 1
+        self.bytes += nbytes
+        self.wire_time += wire_time
+        self.busy_time += busy_time
+        self.wait_total += wait_time
+        self.wait_max = max(self.wait_max, wait_time)
+        self.window_busy += busy_time
+
+    def within_budget(self, now):
+        if self.budget is None:
+            return True
+        if now - self.window_start >= self.window:
+            self.window_start, self.window_busy = now, 0.0
+        return self.window_busy < self.budget * self.window
+
+    def stats(self, elapsed):
+        return {
+            'transactions': self.transactions,
+            'coalesced': self.coalesced,
+            'bytes': self.bytes,
+            'wire_utilization': self.wire_time / elapsed if elapsed else 0,
+            'busy_utilization': self.busy_time / elapsed if elapsed else 0,
+            'wait_avg_ms': self.wait_total / self.transactions * 1000 if self.transactions else 0,
+            'wait_max_ms': self.wait_max * 1000,
+            'budget': self.budget,
+        }
+
+
+class PendingRead:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BusArbiter:
+
+    def __init__(self, bus, smbus=None, frequency=DEFAULT_FREQUENCY, window=1.0, budget_poll=0.005):
+        self.bus = bus
+        self.smbus = smbus if smbus is not None else backend.open_smbus(bus)
+        self.frequency = frequency
+        self.window = window
+        # 所有等待者都超出占用上限时, 重新检查的间隔
+        self.budget_poll = budget_poll
+        self.condition = threading.Condition()
+        self.counter = itertools.count()
+        self.waiters = []
+        self.owner = None
+        self.accounts = {}
+        self.pending_reads = {}
+        self.started = time.monotonic()
+
+    def account(self, device):
+        with self.condition:
+            account = self.accounts.get(device)
+            if account is None:
+                account = self.accounts[device] = BusAccount(device, self.window)
+            return account
+
+    def set_budget(self, device, fraction):
+        """
+        限制设备在每个统计窗口内占用总线的比例, None 为不限制
+        """
+        self.account(device).budget = fraction
+
+    def transaction(self, device, priority, nbytes, fn, *args, coalesce_key=None):
+        """
+        获得总线后执行 fn(*args), nbytes 为线上传输的字节数 (含地址字节), 用于估算总线时间
+        coalesce_key 相同且还在等待的读取直接共用结果
+        """
+        account = self.account(device)
+        pending = None
+        if coalesce_key is not None:
+            with self.condition:
+                shared = self.pending_reads.get(coalesce_key)
+                if shared is None:
+                    pending = self.pending_reads[coalesce_key] = PendingRead()
+            if shared is not None:
+                shared.done.wait()
+                account.coalesced += 1
+                if shared.error is not None:
+                    raise shared.error
+                return shared.result
+        try:
+            result = self.run(account, priority, nbytes, fn, args)
+        except Exception as e:
+            if pending is not None:
+                pending.error = e
+            raise
+        else:
+            if pending is not None:
+                pending.result = result
+            return result
+        finally:
+            if pending is not None:
+                with self.condition:
+                    self.pending_reads.pop(coalesce_key, None)
+                pending.done.set()
+
+    def run(self, account, priority, nbytes, fn, args):
+        enqueued = time.monotonic()
+        seq = next(self.counter)
+        with self.condition:
+            self.waiters.append((-priority, seq, account))
+            self.grant()
+            while self.owner != seq:
+                self.condition.wait(self.budget_poll if self.waiters and self.owner is None else None)
+                self.grant()
+        start = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            end = time.monotonic()
+            with self.condition:
+                account.record(nbytes, nbytes * 9 / self.frequency, end - start, start - enqueued)
+                self.owner = None
+                self.grant()
+                self.condition.notify_all()
+
+    def grant(self):
+        """
+        总线空闲时授权给优先级最高且未超出占用上限的等待者, 需持有 condition
+        """
+        if self.owner is not None or not self.waiters:
+            return
+        now = time.monotonic()
+        for waiter in sorted(self.waiters, key=lambda waiter: waiter[:2]):
+            if waiter[2].within_budget(now):
+                self.waiters.remove(waiter)
+                self.owner = waiter[1]
+                self.condition.notify_all()
+                return
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            'bus': self.bus,
+            'frequency': self.frequency,
+            'elapsed': elapsed,
+            'devices': {name: account.stats(elapsed) for name, account in list(self.accounts.items())},
+        }
+
+
+class ArbitratedSMBus:
+    """
+    SMBus 接口的代理, 每个调用作为一次总线事务交给 BusArbiter
+    可以直接传给 luma 的 i2c(bus=...) 与 PCF8591
+    """
+
+    def __init__(self, arbiter: BusArbiter, device, priority=I2cPriority.SENSOR):
+        self.arbiter = arbiter
+        self.device = device
+        self.priority = priority
+
+    def transaction(self, nbytes, fn, *args, coalesce_key=None):
+        return self.arbiter.transaction(self.device, self.priority, nbytes, fn, *args, coalesce_key=coalesce_key)
+
+    def write_byte(self, addr, val):
+        self.transaction(2, self.arbiter.smbus.write_byte, addr, val)
+
+    def read_byte(self, addr):
+        return self.transaction(2, self.arbiter.smbus.read_byte, addr)
+
+    def write_byte_data(self, addr, cmd, val):
+        self.transaction(3, self.arbiter.smbus.write_byte_data, addr, cmd, val)
+
+    def read_byte_data(self, addr, cmd):
+        return self.transaction(4, self.arbiter.smbus.read_byte_data, addr, cmd,
+                                coalesce_key=(addr, 'byte', cmd))
+
+    def write_i2c_block_data(self, addr, cmd, vals):
+        self.transaction(2 + len(vals), self.arbiter.smbus.write_i2c_block_data, addr, cmd, vals)
+
+    def read_i2c_block_data(self, addr, cmd, length=32):
+        return self.transaction(3 + length, self.arbiter.smbus.read_i2c_block_data, addr, cmd, length,
+                                coalesce_key=(addr, 'block', cmd, length))
+
+    def close(self):
+        pass
+
+
+arbiters = {}
+
+arbiters_lock = threading.Lock()
+
+
+def get_arbiter(bus):
+    with arbiters_lock:
+        arbiter = arbiters.get(bus)
+        if arbiter is None:
+            arbiter = arbiters[bus] = BusArbiter(bus)
+        return arbiter
+
+
+def open_bus(bus, device, priority=I2cPriority.SENSOR):
+    """
+    打开经过仲裁的总线, device 为统计中使用的设备名
+    """
+    return ArbitratedSMBus(get_arbiter(bus), device, priority)
+
+
+def stats():
+    return {bus: arbiter.stats() for bus, arbiter in list(arbiters.items())}
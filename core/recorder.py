@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from pathlib import Path
+
+import cv2 as cv
+
+# 事件录像
+# 内存中保留最近 pre_seconds 秒的 JPEG 帧, 触发后把事件前的帧与之后 post_seconds 秒内的帧
+# 交给后台写入线程, 按 segment_seconds 分段写入 MJPEG 文件, 采集线程只做编码与入队, 不碰磁盘
+
+EncodedFrame = namedtuple('EncodedFrame', ['timestamp', 'data'])
+
+Segment = namedtuple('Segment', ['event', 'frame'])
+
+
+class EventRecorder:
+
+    def __init__(self, directory='./file/camera', pre_seconds=5.0, post_seconds=10.0, fps=10, quality=70,
+                 max_buffer_bytes=8 * 1024 * 1024, max_queue_bytes=16 * 1024 * 1024,
+                 max_write_rate=2 * 1024 * 1024, segment_seconds=60):
+        self.directory = Path(directory)
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.min_interval = 1 / fps
+        self.quality = quality
+        # 事件前缓冲与写入队列的内存上限
+        self.max_buffer_bytes = max_buffer_bytes
+        self.max_queue_bytes = max_queue_bytes
+        # 写入带宽上限 (字节/秒)
+        self.max_write_rate = max_write_rate
+        self.segment_seconds = segment_seconds
+        self.lock = threading.Lock()
+        self.buffer = deque()
+        self.buffer_bytes = 0
+        self.queue = queue.Queue()
+        self.queue_bytes = 0
+        self.event = None
+        self.record_until = 0.0
+        self.last_frame_at = 0.0
+        self.running = True
+        self.frames_encoded = 0
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.bytes_written = 0
+        self.events = 0
+        self.writer = threading.Thread(target=self.write_loop, name='event-recorder', daemon=True)
+        self.writer.start()
+
+    def add_frame(self, frame, timestamp=None):
+        """
+        采集线程调用, 按 fps 抽帧编码后放入缓冲, 录像期间同时放入写入队列
+        """
+        timestamp = timestamp or time.time()
+        if timestamp - self.last_frame_at < self.min_interval:
+            return
+        self.last_frame_at = timestamp
+        ret, buffer = cv.imencode('.jpg', frame, [cv.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ret:
+            return
+        encoded = EncodedFrame(timestamp, buffer.tobytes())
+        self.frames_encoded += 1
+        with self.lock:
+            self.buffer.append(encoded)
+            self.buffer_bytes += len(encoded.data)
+            while self.buffer and (self.buffer_bytes > self.max_buffer_bytes
+                                   or timestamp - self.buffer[0].timestamp > self.pre_seconds):
+                self.buffer_bytes -= len(self.buffer.popleft().data)
+            if self.event is not None:
+                if timestamp <= self.record_until:
+                    self.enqueue(encoded)
+                else:
+                    self.event = None
+
+    def trigger(self, reason='event'):
+        """
+        触发录像, 录像期间再次触发会延长录像时间
+        """
+        now = time.time()
+        with self.lock:
+            self.record_until = max(self.record_until, now + self.post_seconds)
+            if self.event is not None:
+                return self.event
+            self.events += 1
+            # 目录名带毫秒与事件序号, 同一秒内的两个事件不会写入同一个目录
+            self.event = '%s.%03d-%d-%s' % (time.strftime('%Y%m%d-%H%M%S', time.localtime(now)),
+                                            int(now * 1000) % 1000, self.events, reason)
+            for encoded in self.buffer:
+                self.enqueue(encoded)
+            return self.event
+
+    def enqueue(self, encoded):
+        if self.queue_bytes + len(encoded.data) > self.max_queue_bytes:
+            self.frames_dropped += 1
+            return
+        self.queue_bytes += len(encoded.data)
+        self.queue.put(Segment(self.event, encoded))
+
+    def write_loop(self):
+        current_event = None
+        current_file = None
+        segment_start = 0.0
+        segment_index = 0
+        window_start = time.monotonic()
+        window_bytes = 0
+        while self.running or not self.queue.empty():
+            try:
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self.lock:
+                self.queue_bytes -= len(item.frame.data)
+            try:
+                if (current_file is None or item.event != current_event
+                        or item.frame.timestamp - segment_start >= self.segment_seconds):
+                    if current_file is not None:
+                        current_file.close()
+                    # 写入失败后同一事件从下一个分段继续, 不会重新打开并截断已写入的分段
+                    segment_index = segment_index + 1 if item.event == current_event else 0
+                    current_event = item.event
+                    segment_start = item.frame.timestamp
+                    event_dir = self.directory.joinpath(current_event)
+                    event_dir.mkdir(parents=True, exist_ok=True)
+                    current_file = open(str(event_dir.joinpath('segment-%03d.mjpeg' % segment_index)), 'wb')
+                current_file.write(item.frame.data)
+                self.frames_written += 1
+                self.bytes_written += len(item.frame.data)
+                # 缓冲区中的写入错误 (ENOSPC, EIO) 在 flush 时才抛出, 与写入错误一样处理
+                if self.queue.empty():
+                    current_file.flush()
+            except OSError as e:
+                print('录像写入失败:', e)
+                self.close_quietly(current_file)
+                current_file = None
+                continue
+            # 按写入带宽上限限速
+            window_bytes += len(item.frame.data)
+            expected = window_bytes / self.max_write_rate
+            elapsed = time.monotonic() - window_start
+            if expected > elapsed:
+                time.sleep(expected - elapsed)
+            if elapsed > 1:
+                window_start, window_bytes = time.monotonic(), 0
+        self.close_quietly(current_file)
+
+    @staticmethod
+    def close_quietly(file):
+        if file is None:
+            return
+        try:
+            file.close()
+        except OSError as e:
+            print('录像文件关闭失败:', e)
+
+    def stop(self):
+        self.running = False
+        self.writer.join(timeout=5)
+
+    def stats(self):
+        return {
+            'events': self.events,
+            'recording': self.event is not None,
+            'buffer_frames': len(self.buffer),
+            'buffer_bytes': self.buffer_bytes,
+            'queue_bytes': self.queue_bytes,
+            'frames_encoded': self.frames_encoded,
+            'frames_written': self.frames_written,
+            'frames_dropped': self.frames_dropped,
+            'bytes_written': self.bytes_written,
+        }
@@ -0,0 +1,158 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 单线程协作式调度器
+# 所有声明了 period 的功能由一个调度线程按最小堆中的到期时间执行 step(), 不再每个功能一个线程
+# 声明 blocking 的功能 (会阻塞在设备 I/O 上) 交给有界线程池执行, 同一功能不会同时执行两次
+# 声明 trigger (EdgeInput) 的功能在 GPIO 边沿到来时立即执行
+
+
+class ScheduledFunction:
+
+    def __init__(self, function):
+        self.function = function
+        self.token = 0
+        self.busy = False
+        self.runs = 0
+        self.overruns = 0
+        self.errors = 0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+        self.duration_total = 0.0
+        self.duration_max = 0.0
+
+    def stats(self):
+        runs = self.runs or 1
+        return {
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'errors': self.errors,
+            'jitter_avg': self.jitter_total / runs,
+            'jitter_max': self.jitter_max,
+            'duration_avg': self.duration_total / runs,
+            'duration_max': self.duration_max,
+        }
+
+
+class FunctionScheduler:
+
+    def __init__(self, max_workers=2):
+        self.condition = threading.Condition()
+        self.heap = []
+        self.counter = itertools.count()
+        self.entries = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='function-io')
+        self.running = False
+        self.thread = None
+
+    def add(self, function):
+        entry = ScheduledFunction(function)
+        function.open()
+        if function.trigger is not None:
+            function.trigger.add_listener(lambda channel: self.wake(function))
+        with self.condition:
+            self.entries[function.thread_id] = entry
+            self.push(entry, time.monotonic())
+
+    def wake(self, function):
+        """
+        立即执行功能, 用于 GPIO 边沿等触发源
+        """
+        with self.condition:
+            entry = self.entries.get(function.thread_id)
+            if entry is not None:
+                self.push(entry, time.monotonic())
+
+    def push(self, entry, due):
+        # 更新 token 使堆中该功能更早的条目失效
+        entry.token += 1
+        heapq.heappush(self.heap, (due, next(self.counter), entry, entry.token))
+        self.condition.notify()
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.loop, name='function-scheduler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.executor.shutdown(wait=False)
+        for entry in list(self.entries.values()):
+            entry.function.close()
+        self.entries.clear()
+
+    def loop(self):
+        while True:
+            with self.condition:
+                while self.running:
+                    now = time.monotonic()
+                    if self.heap and self.heap[0][0] <= now:
+                        break
+                    self.condition.wait(self.heap[0][0] - now if self.heap else None)
+                if not self.running:
+                    return
+                due, _, entry, token = heapq.heappop(self.heap)
+                if token != entry.token or entry.busy:
+                    continue
+            self.dispatch(entry, due)
+
+    def dispatch(self, entry, due):
+        function = entry.function
+        if not function.running.is_set():
+            with self.condition:
+                self.entries.pop(function.thread_id, None)
+            function.close()
+            return
+        if not function.status.is_set():
+            # 暂停中, 稍后再检查
+            with self.condition:
+                self.push(entry, due + (function.period or 1.0))
+            return
+        start = time.monotonic()
+        if function.blocking:
+            entry.busy = True
+            self.executor.submit(self.execute, entry, due, start)
+        else:
+            self.execute(entry, due, start)
+
+    def execute(self, entry, due, start):
+        function = entry.function
+        delay = None
+        try:
+            delay = function.step()
+        except Exception as e:
+            entry.errors += 1
+            print('功能执行异常', function.thread_id, e)
+        end = time.monotonic()
+        duration = end - start
+        jitter = start - due
+        entry.runs += 1
+        entry.jitter_total += jitter
+        entry.jitter_max = max(entry.jitter_max, jitter)
+        entry.duration_total += duration
+        entry.duration_max = max(entry.duration_max, duration)
+        if delay is not None:
+            next_due = end + delay
+        else:
+            next_due = due + function.period
+            if next_due < end:
+                # 执行时间超过周期, 从当前时间重新开始计时
+                entry.overruns += 1
+                next_due = end
+        with self.condition:
+            entry.busy = False
+            if self.running and function.thread_id in self.entries:
+                self.push(entry, next_due)
+
+    def stats(self):
+        return {function_id.value if hasattr(function_id, 'value') else function_id: entry.stats()
+                for function_id, entry in list(self.entries.items())}
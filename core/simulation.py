@@ -0,0 +1,560 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+# 模拟硬件
+# 在没有树莓派的环境 (开发机 / CI) 中代替 RPi.GPIO, smbus, Adafruit_DHT 与 cv2.VideoCapture
+# 所有随机行为使用固定种子, 时序模型 (I2C 传输耗时, DHT11 读取耗时与失败率, 摄像头帧率) 可复现
+#
+# 环境变量:
+#   PI_BOT_SIM_SEED       随机种子, 默认 1
+#   PI_BOT_SIM_REALTIME   1 按硬件时序真实等待 (默认), 0 不等待只记录耗时
+#   PI_BOT_SIM_I2C_HZ     I2C 时钟频率, 默认 100000
+#   PI_BOT_SIM_DHT_FAIL   DHT11 单次读取失败率, 默认 0.25
+#   PI_BOT_SIM_VIDEO      摄像头使用的录制视频文件, 不设置则生成合成画面
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+class SimulationClock:
+    """
+    模拟时序, realtime 为 False 时只累计应等待的时间而不真正休眠
+    """
+
+    def __init__(self, realtime=True):
+        self.realtime = realtime
+        self.lock = threading.Lock()
+        self.simulated_wait = 0.0
+
+    def wait(self, seconds):
+        if seconds <= 0:
+            return
+        if self.realtime:
+            time.sleep(seconds)
+        else:
+            with self.lock:
+                self.simulated_wait += seconds
+
+
+class SimulatedGPIO:
+    """
+    RPi.GPIO 接口的模拟实现
+    输入引脚电平可以通过 set_input 直接设置, 或通过 script 按时间脚本产生边沿
+    """
+
+    BOARD = 10
+    BCM = 11
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    VERSION = 'sim'
+
+    RPI_INFO = {'P1_REVISION': 3, 'REVISION': 'sim', 'TYPE': 'Simulated', 'MANUFACTURER': 'pi-bot',
+                'PROCESSOR': 'sim', 'RAM': '512M'}
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.mode = None
+        self.warnings = True
+        self.functions = {}
+        self.levels = {}
+        self.detections = {}
+        self.output_count = 0
+        self.history = deque(maxlen=1024)
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def getmode(self):
+        return self.mode
+
+    def setwarnings(self, flag):
+        self.warnings = flag
+
+    def setup(self, channel, direction, pull_up_down=PUD_OFF, initial=None):
+        with self.lock:
+            for ch in self._channels(channel):
+                self.functions[ch] = direction
+                if direction == self.OUT:
+                    self.levels[ch] = self.LOW if initial is None else int(initial)
+                elif ch not in self.levels:
+                    self.levels[ch] = self.HIGH if pull_up_down == self.PUD_UP else self.LOW
+
+    def gpio_function(self, channel):
+        return self.functions.get(channel, self.IN)
+
+    def output(self, channel, value):
+        channels = self._channels(channel)
+        values = list(value) if isinstance(value, (list, tuple)) else [value] * len(channels)
+        if len(values) != len(channels):
+            raise RuntimeError('Number of channels != number of values')
+        with self.lock:
+            for ch, val in zip(channels, values):
+                if self.functions.get(ch) != self.OUT:
+                    raise RuntimeError('The GPIO channel has not been set up as an OUTPUT')
+                self.levels[ch] = int(bool(val))
+                self.history.append((time.monotonic(), ch, int(bool(val))))
+            self.output_count += 1
+
+    def input(self, channel):
+        with self.lock:
+            if channel not in self.functions:
+                raise RuntimeError('You must setup() the GPIO channel first')
+            return self.levels.get(channel, self.LOW)
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        with self.lock:
+            if channel in self.detections:
+                raise RuntimeError('Conflicting edge detection already enabled for this GPIO channel')
+            self.detections[channel] = {'edge': edge, 'callbacks': [], 'bouncetime': (bouncetime or 0) / 1000,
+                                        'last': None, 'detected': False}
+            if callback is not None:
+                self.detections[channel]['callbacks'].append(callback)
+
+    def add_event_callback(self, channel, callback):
+        with self.lock:
+            detection = self.detections.get(channel)
+            if detection is None:
+                raise RuntimeError('Add event detection using add_event_detect first before adding a callback')
+            detection['callbacks'].append(callback)
+
+    def remove_event_detect(self, channel):
+        with self.lock:
+            self.detections.pop(channel, None)
+
+    def event_detected(self, channel):
+        with self.lock:
+            detection = self.detections.get(channel)
+            if detection is None or not detection['detected']:
+                return False
+            detection['detected'] = False
+            return True
+
+    def wait_for_edge(self, channel, edge, bouncetime=None, timeout=None):
+        event = threading.Event()
+        self.add_event_detect(channel, edge, lambda ch: event.set(), bouncetime)
+        try:
+            if event.wait(None if timeout is None else timeout / 1000):
+                return channel
+            return None
+        finally:
+            self.remove_event_detect(channel)
+
+    def cleanup(self, channel=None):
+        with self.lock:
+            if channel is None:
+                self.functions.clear()
+                self.levels.clear()
+                self.detections.clear()
+                return
+            for ch in self._channels(channel):
+                self.functions.pop(ch, None)
+                self.levels.pop(ch, None)
+                self.detections.pop(ch, None)
+
+    # 以下为模拟专用接口
+
+    def set_input(self, channel, level):
+        """
+        设置输入引脚电平, 产生边沿时按 RPi.GPIO 的去抖规则触发回调
+        """
+        level = int(bool(level))
+        with self.lock:
+            previous = self.levels.get(channel, self.LOW)
+            self.levels[channel] = level
+            detection = self.detections.get(channel)
+            if previous == level or detection is None:
+                return
+            rising = level == self.HIGH
+            if detection['edge'] == self.RISING and not rising:
+                return
+            if detection['edge'] == self.FALLING and rising:
+                return
+            now = time.monotonic()
+            if detection['last'] is not None and now - detection['last'] < detection['bouncetime']:
+                return
+            detection['last'] = now
+            detection['detected'] = True
+            callbacks = list(detection['callbacks'])
+        for callback in callbacks:
+            callback(channel)
+
+    def script(self, channel, edges, loop=False):
+        """
+        按脚本产生输入边沿, edges 为 [(延迟秒数, 电平), ...], 延迟相对上一个边沿
+        返回用于停止脚本的 Event
+        """
+        stopped = threading.Event()
+
+        def play():
+            while not stopped.is_set():
+                for delay, level in edges:
+                    if stopped.wait(delay):
+                        return
+                    self.set_input(channel, level)
+                if not loop:
+                    return
+
+        threading.Thread(target=play, name='sim-gpio-%s' % channel, daemon=True).start()
+        return stopped
+
+    @staticmethod
+    def _channels(channel):
+        return list(channel) if isinstance(channel, (list, tuple)) else [channel]
+
+
+class SimulatedI2cDevice:
+
+    def write(self, data):
+        pass
+
+    def read(self, length):
+        return [0] * length
+
+
+class SimulatedPCF8591(SimulatedI2cDevice):
+    """
+    PCF8591 寄存器模型
+    控制字: bit6 模拟输出使能, bit2 自动递增, bit0-1 通道
+    读取返回的是上一次转换的结果, 与真实芯片一样存在一个字节的流水线延迟
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.control = 0x00
+        self.channel = 0
+        self.dac = 0
+        self.last_conversion = 0x80
+        self.start = time.monotonic()
+        self.sources = {
+            # 光敏电阻, 缓慢变化的亮度
+            0: lambda t: 120 + 40 * ((t % 60) / 60),
+            1: lambda t: 128,
+            2: lambda t: 64,
+            3: lambda t: 200,
+        }
+
+    def set_channel(self, channel, source):
+        """
+        设置通道输入, source 为 0-255 的值或以运行秒数为参数的函数
+        """
+        self.sources[channel] = source if callable(source) else (lambda t, v=source: v)
+
+    def sample(self, channel):
+        value = self.sources[channel](time.monotonic() - self.start) + self.rng.uniform(-1, 1)
+        return max(0, min(255, int(value)))
+
+    def write(self, data):
+        if not data:
+            return
+        self.control = data[0]
+        self.channel = self.control & 0x03
+        if len(data) > 1:
+            self.dac = data[-1]
+
+    def read(self, length):
+        result = []
+        for i in range(length):
+            result.append(self.last_conversion)
+            self.last_conversion = self.sample(self.channel)
+            if self.control & 0x04:
+                self.channel = (self.channel + 1) & 0x03
+        return result
+
+
+class SimulatedSSD1306(SimulatedI2cDevice):
+    """
+    SSD1306 寄存器模型, 解析命令流并维护显存 (GDDRAM)
+    控制字节 0x00 为命令, 0x40 为数据
+    """
+
+    # 带参数的命令及参数个数
+    command_args = {0x20: 1, 0x21: 2, 0x22: 2, 0x81: 1, 0x8D: 1, 0xA8: 1, 0xD3: 1,
+                    0xD5: 1, 0xD9: 1, 0xDA: 1, 0xDB: 1}
+
+    def __init__(self, width=128, height=64):
+        self.width = width
+        self.pages = height // 8
+        self.ram = bytearray(self.width * self.pages)
+        self.display_on = False
+        self.column_range = (0, width - 1)
+        self.page_range = (0, self.pages - 1)
+        self.column = 0
+        self.page = 0
+        self.pending = []
+        self.data_bytes = 0
+        self.command_bytes = 0
+
+    def write(self, data):
+        if not data:
+            return
+        control, payload = data[0], data[1:]
+        if control == 0x40:
+            self.write_data(payload)
+        else:
+            self.write_commands(payload)
+
+    def write_commands(self, commands):
+        self.command_bytes += len(commands)
+        for byte in commands:
+            self.pending.append(byte)
+            cmd = self.pending[0]
+            if len(self.pending) <= self.command_args.get(cmd, 0):
+                continue
+            args = self.pending[1:]
+            self.pending = []
+            if cmd == 0xAE:
+                self.display_on = False
+            elif cmd == 0xAF:
+                self.display_on = True
+            elif cmd == 0x21:
+                self.column_range = (args[0], args[1])
+                self.column = args[0]
+            elif cmd == 0x22:
+                self.page_range = (args[0], args[1])
+                self.page = args[0]
+
+    def write_data(self, data):
+        self.data_bytes += len(data)
+        for byte in data:
+            if self.page < self.pages and self.column < self.width:
+                self.ram[self.page * self.width + self.column] = byte
+            self.column += 1
+            if self.column > self.column_range[1]:
+                self.column = self.column_range[0]
+                self.page += 1
+                if self.page > self.page_range[1]:
+                    self.page = self.page_range[0]
+
+    def framebuffer(self):
+        return bytes(self.ram)
+
+
+class SimulatedSMBus:
+    """
+    smbus.SMBus 接口的模拟实现
+    同一总线上的传输互斥, 每次传输按 (地址 + 数据字节) * 9 位 / 时钟频率 计算总线占用时间
+    """
+
+    def __init__(self, bus, devices, clock, frequency=100000):
+        self.bus = bus
+        self.devices = devices
+        self.clock = clock
+        self.frequency = frequency
+        self.lock = threading.Lock()
+        self.transactions = 0
+        self.bytes = 0
+        self.busy_time = {}
+
+    def _transfer(self, addr, write=None, read=0):
+        device = self.devices.get(addr)
+        if device is None:
+            raise OSError(121, 'Remote I/O error')
+        length = 1 + (len(write) if write else 0) + read
+        cost = length * 9 / self.frequency
+        with self.lock:
+            self.clock.wait(cost)
+            self.transactions += 1
+            self.bytes += length
+            self.busy_time[addr] = self.busy_time.get(addr, 0.0) + cost
+            if write:
+                device.write(write)
+            if read:
+                return device.read(read)
+        return None
+
+    def write_byte(self, addr, val):
+        self._transfer(addr, write=[val])
+
+    def read_byte(self, addr):
+        return self._transfer(addr, read=1)[0]
+
+    def write_byte_data(self, addr, cmd, val):
+        self._transfer(addr, write=[cmd, val])
+
+    def read_byte_data(self, addr, cmd):
+        self._transfer(addr, write=[cmd])
+        return self._transfer(addr, read=1)[0]
+
+    def write_i2c_block_data(self, addr, cmd, vals):
+        self._transfer(addr, write=[cmd] + list(vals))
+
+    def read_i2c_block_data(self, addr, cmd, length=32):
+        self._transfer(addr, write=[cmd])
+        return self._transfer(addr, read=length)
+
+    def close(self):
+        pass
+
+
+class SimulatedDHT:
+    """
+    Adafruit_DHT 接口的模拟实现
+    DHT11 单次读取约 25ms, 按失败率返回 (None, None), read_retry 与原库一样失败后间隔 2 秒重试
+    """
+
+    DHT11 = 11
+    DHT22 = 22
+    AM2302 = 22
+
+    def __init__(self, rng, clock, latency=0.025, failure_rate=0.25):
+        self.rng = rng
+        self.clock = clock
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.failures = 0
+        self.start = time.monotonic()
+
+    def read(self, sensor, pin):
+        with self.lock:
+            self.clock.wait(self.rng.gauss(self.latency, self.latency / 10))
+            self.reads += 1
+            if self.rng.random() < self.failure_rate:
+                self.failures += 1
+                return None, None
+            t = time.monotonic() - self.start
+            humidity = 55 + 5 * ((t % 600) / 600)
+            temperature = 24 + 2 * ((t % 1200) / 1200)
+            if sensor == self.DHT11:
+                return float(int(humidity)), float(int(temperature))
+            return round(humidity, 1), round(temperature, 1)
+
+    def read_retry(self, sensor, pin, retries=15, delay_seconds=2, platform=None):
+        for i in range(retries):
+            humidity, temperature = self.read(sensor, pin)
+            if humidity is not None and temperature is not None:
+                return humidity, temperature
+            self.clock.wait(delay_seconds)
+        return None, None
+
+
+class SimulatedVideoCapture:
+    """
+    cv2.VideoCapture 接口的模拟实现
+    设置了 PI_BOT_SIM_VIDEO 时循环播放录制的视频, 否则生成带移动方块的合成画面
+    """
+
+    # 与 cv2.CAP_PROP_* 取值一致
+    CAP_PROP_FRAME_WIDTH = 3
+    CAP_PROP_FRAME_HEIGHT = 4
+    CAP_PROP_FPS = 5
+
+    def __init__(self, index, clock, rng, video_path=None):
+        self.index = index
+        self.clock = clock
+        self.rng = rng
+        self.video_path = video_path
+        self.props = {self.CAP_PROP_FRAME_WIDTH: 640, self.CAP_PROP_FRAME_HEIGHT: 480, self.CAP_PROP_FPS: 30}
+        self.opened = True
+        self.frame_index = 0
+        self.last_read = None
+        self.source = None
+        self.background = None
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        self.props[prop] = value
+        self.background = None
+        return True
+
+    def get(self, prop):
+        return self.props.get(prop, 0)
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        fps = self.props[self.CAP_PROP_FPS] or 30
+        now = time.monotonic()
+        if self.last_read is not None:
+            self.clock.wait(1 / fps - (now - self.last_read))
+        self.last_read = time.monotonic()
+        self.frame_index += 1
+        if self.video_path:
+            return self._read_video()
+        return True, self._synthetic_frame()
+
+    def _read_video(self):
+        import cv2 as cv
+        if self.source is None:
+            self.source = cv.VideoCapture(self.video_path)
+        ret, frame = self.source.read()
+        if not ret:
+            self.source.set(cv.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.source.read()
+        return ret, frame
+
+    def _synthetic_frame(self):
+        import numpy as np
+        width = int(self.props[self.CAP_PROP_FRAME_WIDTH])
+        height = int(self.props[self.CAP_PROP_FRAME_HEIGHT])
+        if self.background is None:
+            gradient = np.linspace(40, 160, width, dtype=np.uint8)
+            self.background = np.repeat(np.tile(gradient, (height, 1))[:, :, None], 3, axis=2)
+        frame = self.background.copy()
+        size = height // 4
+        x = (self.frame_index * 4) % (width - size)
+        y = (height - size) // 2
+        frame[y:y + size, x:x + size] = 220
+        return frame
+
+    def release(self):
+        self.opened = False
+        if self.source is not None:
+            self.source.release()
+
+
+class SimulatedHardware:
+    """
+    模拟硬件集合, 按树莓派上的接线提供 GPIO, I2C 总线 (PCF8591@0x48, SSD1306@0x3c), DHT11 与摄像头
+    """
+
+    def __init__(self, seed=1, realtime=True, i2c_frequency=100000, dht_failure_rate=0.25, video_path=None):
+        self.seed = seed
+        self.clock = SimulationClock(realtime)
+        self.i2c_frequency = i2c_frequency
+        self.video_path = video_path
+        self.gpio = SimulatedGPIO()
+        # 烟雾传感器 (GPIO17) DO 输出无烟时为高电平
+        self.gpio.levels[17] = SimulatedGPIO.HIGH
+        self.dht = SimulatedDHT(random.Random(seed), self.clock, failure_rate=dht_failure_rate)
+        self.pcf8591 = SimulatedPCF8591(random.Random(seed + 1))
+        self.ssd1306 = SimulatedSSD1306()
+        self.buses = {}
+        self.captures = {}
+        self.lock = threading.Lock()
+
+    def smbus(self, bus):
+        with self.lock:
+            if bus not in self.buses:
+                self.buses[bus] = SimulatedSMBus(bus, {0x48: self.pcf8591, 0x3c: self.ssd1306},
+                                                 self.clock, self.i2c_frequency)
+            return self.buses[bus]
+
+    def video_capture(self, index):
+        with self.lock:
+            capture = SimulatedVideoCapture(index, self.clock, random.Random(self.seed + 2), self.video_path)
+            self.captures[index] = capture
+            return capture
+
+
+hardware = SimulatedHardware(seed=int(os.environ.get('PI_BOT_SIM_SEED', 1)),
+                             realtime=os.environ.get('PI_BOT_SIM_REALTIME', '1') != '0',
+                             i2c_frequency=int(os.environ.get('PI_BOT_SIM_I2C_HZ', 100000)),
+                             dht_failure_rate=_env_float('PI_BOT_SIM_DHT_FAIL', 0.25),
+                             video_path=os.environ.get('PI_BOT_SIM_VIDEO'))
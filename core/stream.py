@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2 as cv
+
+# 本地 MJPEG 推流
+# 每帧只编码一次, 编码后的 bytes 不可变, 所有客户端共享同一份数据
+# 每个客户端在自己的线程中发送, 发送慢的客户端只会跳过中间帧, 不影响采集与其他客户端
+
+EncodedFrame = namedtuple('EncodedFrame', ['seq', 'encoded_at', 'data'])
+
+BOUNDARY = 'pibotframe'
+
+INDEX_PAGE = b'<html><head><title>pi-bot</title></head><body><img src="/stream.mjpg"/></body></html>'
+
+
+class ClientStats:
+
+    def __init__(self, address):
+        self.address = '%s:%s' % address[:2]
+        self.connected_at = time.monotonic()
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+
+    def to_dict(self):
+        elapsed = time.monotonic() - self.connected_at
+        return {'address': self.address, 'frames_sent': self.frames_sent, 'frames_dropped': self.frames_dropped,
+                'bytes_sent': self.bytes_sent, 'fps': self.frames_sent / elapsed if elapsed else 0}
+
+
+class MjpegStreamer:
+    """
+    MJPEG HTTP 服务
+    /            预览页面
+    /stream.mjpg MJPEG 视频流
+    /stats       编码器与各客户端的统计 (JSON)
+    """
+
+    def __init__(self, host='0.0.0.0', port=8080, quality=80, max_fps=15):
+        self.host = host
+        self.port = port
+        self.quality = quality
+        self.min_interval = 1 / max_fps if max_fps else 0
+        self.condition = threading.Condition()
+        self.frame = None
+        self.seq = 0
+        self.clients = []
+        self.server = None
+        self.thread = None
+        self.running = False
+        self.frames_encoded = 0
+        self.frames_skipped = 0
+        self.bytes_encoded = 0
+        self.encode_time = 0.0
+
+    def start(self):
+        handler = type('Handler', (MjpegRequestHandler,), {'streamer': self})
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.server.daemon_threads = True
+        self.running = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='mjpeg-server', daemon=True)
+        self.thread.start()
+        print('MJPEG 推流已启动: http://%s:%s/' % (self.host, self.server.server_address[1]))
+
+    def stop(self):
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def has_clients(self):
+        return bool(self.clients)
+
+    def publish(self, frame):
+        """
+        编码并发布一帧, 没有客户端或超过帧率上限时直接跳过
+        """
+        now = time.monotonic()
+        last = self.frame
+        if not self.clients or (last is not None and now - last.encoded_at < self.min_interval):
+            self.frames_skipped += 1
+            return False
+        ret, buffer = cv.imencode('.jpg', frame, [cv.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ret:
+            return False
+        data = buffer.tobytes()
+        self.encode_time += time.monotonic() - now
+        self.frames_encoded += 1
+        self.bytes_encoded += len(data)
+        with self.condition:
+            self.seq += 1
+            self.frame = EncodedFrame(self.seq, now, data)
+            self.condition.notify_all()
+        return True
+
+    def next_frame(self, after_seq, timeout=1.0):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.running or self.seq > after_seq, timeout)
+            if not self.running or self.seq <= after_seq:
+                return None
+            return self.frame
+
+    def stats(self):
+        return {
+            'frames_encoded': self.frames_encoded,
+            'frames_skipped': self.frames_skipped,
+            'bytes_encoded': self.bytes_encoded,
+            'encode_ms_avg': self.encode_time / self.frames_encoded * 1000 if self.frames_encoded else 0,
+            'clients': [client.to_dict() for client in list(self.clients)],
+        }
+
+
+class MjpegRequestHandler(BaseHTTPRequestHandler):
+
+    streamer = None  # type: MjpegStreamer
+
+    def do_GET(self):
+        if self.path == '/':
+            self.send_body(INDEX_PAGE, 'text/html; charset=utf-8')
+        elif self.path == '/stats':
+            self.send_body(json.dumps(self.streamer.stats()).encode('utf-8'), 'application/json')
+        elif self.path == '/stream.mjpg':
+            self.send_stream()
+        else:
+            self.send_error(404)
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self):
+        self.send_response(200)
+        self.send_header('Cache-Control', 'no-cache, private')
+        self.send_header('Pragma', 'no-cache')
+        self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=' + BOUNDARY)
+        self.end_headers()
+        client = ClientStats(self.client_address)
+        self.streamer.clients.append(client)
+        last_seq = 0
+        try:
+            while self.streamer.running:
+                frame = self.streamer.next_frame(last_seq)
+                if frame is None:
+                    continue
+                if last_seq:
+                    client.frames_dropped += frame.seq - last_seq - 1
+                last_seq = frame.seq
+                header = ('--%s\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n'
+                          % (BOUNDARY, len(frame.data))).encode('ascii')
+                self.wfile.write(header)
+                self.wfile.write(frame.data)
+                self.wfile.write(b'\r\n')
+                client.frames_sent += 1
+                client.bytes_sent += len(header) + len(frame.data) + 2
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.streamer.clients.remove(client)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,332 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+import cv2 as cv
+
+# 摄像头流水线
+# 采集线程 -> 环形缓冲 (只保留最新帧) -> 检测线程池 -> 订阅者
+# 检测跟不上采集时直接丢弃旧帧, 保证输出的始终是最新画面
+
+CapturedFrame = namedtuple('CapturedFrame', ['seq', 'captured_at', 'frame'])
+
+DetectionResult = namedtuple('DetectionResult', ['seq', 'captured_at', 'detected_at', 'frame', 'faces'])
+
+# 跟踪目标, box 与 template 均为缩小后的灰度图坐标
+Track = namedtuple('Track', ['box', 'template', 'confidence'])
+
+
+class FrameRing:
+    """
+    有界环形缓冲, 写入永不阻塞, 满时覆盖最旧的帧
+    """
+
+    def __init__(self, capacity=4):
+        self.frames = deque(maxlen=capacity)
+        self.condition = threading.Condition()
+        self.seq = 0
+        self.closed = False
+
+    def put(self, frame, captured_at=None):
+        with self.condition:
+            self.seq += 1
+            self.frames.append(CapturedFrame(self.seq, captured_at or time.monotonic(), frame))
+            self.condition.notify_all()
+            return self.seq
+
+    def latest(self, after_seq=0, timeout=None):
+        """
+        等待并返回比 after_seq 新的最新一帧, 超时或关闭返回 None
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.closed or self.seq > after_seq, timeout):
+                return None
+            if self.closed or not self.frames:
+                return None
+            return self.frames[-1]
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class Subscription:
+    """
+    订阅者信箱, 只保留最新的一个结果, 消费慢时旧结果被覆盖
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.result = None
+        self.received = 0
+        self.dropped = 0
+
+    def publish(self, result):
+        with self.condition:
+            if self.result is not None:
+                self.dropped += 1
+            self.result = result
+            self.received += 1
+            self.condition.notify_all()
+
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.result is not None, timeout):
+                return None
+            result, self.result = self.result, None
+            return result
+
+
+class CameraPipeline:
+    """
+    摄像头流水线
+    采集线程持续读取摄像头, 避免帧在 V4L2 队列中变旧
+    检测线程 (OpenCV 检测时释放 GIL, 线程即可并行) 每次取最新一帧, 未取到的帧计为丢弃
+    """
+
+    def __init__(self, camera, workers=2, ring_size=4, latency_window=120):
+        self.camera = camera
+        self.workers = workers
+        self.ring = FrameRing(ring_size)
+        self.subscriptions = []
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+        self.threads = []
+        self.claimed_seq = 0
+        self.published_seq = 0
+        self.captured = 0
+        self.processed = 0
+        self.dropped = 0
+        self.dropped_late = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.started_at = None
+
+    def start(self):
+        if self.running.is_set():
+            return
+        self.running.set()
+        self.started_at = time.monotonic()
+        self.threads = [threading.Thread(target=self.grab, name='camera-grabber', daemon=True)]
+        for i in range(self.workers):
+            self.threads.append(threading.Thread(target=self.detect, name='camera-detector-%d' % i, daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.running.clear()
+        self.ring.close()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=2)
+        self.threads = []
+
+    def subscribe(self, callback=None):
+        """
+        订阅检测结果, 传入 callback 时在检测线程中回调, 否则返回 Subscription 信箱
+        """
+        with self.lock:
+            if callback is not None:
+                self.callbacks.append(callback)
+                return callback
+            subscription = Subscription()
+            self.subscriptions.append(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+            if subscription in self.callbacks:
+                self.callbacks.remove(subscription)
+
+    def grab(self):
+        while self.running.is_set():
+            ret, frame = self.camera.read_frame()
+            if not ret:
+                time.sleep(0.01)
+                continue
+            self.ring.put(frame)
+            self.captured += 1
+
+    def take(self):
+        """
+        取出尚未被任何检测线程处理的最新一帧
+        """
+        while self.running.is_set():
+            item = self.ring.latest(self.claimed_seq, timeout=0.5)
+            if item is None:
+                continue
+            with self.lock:
+                if item.seq <= self.claimed_seq:
+                    continue
+                self.dropped += item.seq - self.claimed_seq - 1
+                self.claimed_seq = item.seq
+            return item
+        return None
+
+    def detect(self):
+        while self.running.is_set():
+            item = self.take()
+            if item is None:
+                return
+            # 环形缓冲中的帧可能被其他线程读取, 标注前先复制
+            frame = item.frame.copy()
+            faces = self.camera.detect_faces(frame)
+            self.camera.annotate(frame, faces)
+            result = DetectionResult(item.seq, item.captured_at, time.monotonic(), frame, faces)
+            self.publish(result)
+
+    def publish(self, result):
+        with self.lock:
+            self.processed += 1
+            if result.seq < self.published_seq:
+                # 多个检测线程时, 比已发布结果更旧的结果直接丢弃
+                self.dropped_late += 1
+                return
+            self.published_seq = result.seq
+            self.latencies.append(result.detected_at - result.captured_at)
+            subscriptions = list(self.subscriptions)
+            callbacks = list(self.callbacks)
+        for subscription in subscriptions:
+            subscription.publish(result)
+        for callback in callbacks:
+            callback(result)
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        latencies = sorted(self.latencies)
+        motion_gate = getattr(self.camera, 'motion_gate', None)
+        return {
+            'motion_gate': motion_gate.stats() if motion_gate is not None else None,
+            'captured': self.captured,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'dropped_late': self.dropped_late,
+            'capture_fps': self.captured / elapsed if elapsed else 0,
+            'detect_fps': self.processed / elapsed if elapsed else 0,
+            'latency_avg': sum(latencies) / len(latencies) if latencies else 0,
+            'latency_max': latencies[-1] if latencies else 0,
+            'subscriber_dropped': [subscription.dropped for subscription in self.subscriptions],
+        }
+
+
+class FaceTracker:
+    """
+    先检测后跟踪
+    每 detect_interval 帧, 或任一目标的跟踪置信度低于 min_confidence 时运行完整检测,
+    其余帧在目标原位置附近做模板匹配
+    检测与跟踪都在缩小 scale 倍的灰度图上进行, 返回的坐标映射回原分辨率
+    """
+
+    def __init__(self, detector, detect_interval=5, scale=0.5, min_confidence=0.6, search_margin=0.5):
+        # detector(gray, min_size) 返回缩小后灰度图上的 (x, y, w, h) 列表
+        self.detector = detector
+        self.detect_interval = detect_interval
+        self.scale = scale
+        self.min_confidence = min_confidence
+        self.search_margin = search_margin
+        self.lock = threading.Lock()
+        self.tracks = []
+        self.frame_count = 0
+        self.last_detect = None
+        self.detections = 0
+        self.tracked = 0
+
+    def update(self, gray, min_size=(32, 32)):
+        small = self.downscale(gray)
+        with self.lock:
+            self.frame_count += 1
+            tracks = self.tracks
+            need_detect = self.last_detect is None \
+                or self.frame_count - self.last_detect >= self.detect_interval \
+                or any(track.confidence < self.min_confidence for track in tracks)
+            if need_detect:
+                self.last_detect = self.frame_count
+        # 检测在锁外进行, 多个检测线程可以并行
+        if need_detect:
+            size = (max(1, int(min_size[0] * self.scale)), max(1, int(min_size[1] * self.scale)))
+            tracks = [Track(tuple(int(v) for v in box), self.crop(small, box), 1.0)
+                      for box in self.detector(small, size)]
+            self.detections += 1
+        else:
+            tracks = [track for track in (self.follow(small, track) for track in tracks) if track is not None]
+            self.tracked += 1
+        with self.lock:
+            self.tracks = tracks
+        return [self.upscale(track.box) for track in tracks]
+
+    def follow(self, small, track):
+        x, y, w, h = track.box
+        margin_x, margin_y = int(w * self.search_margin), int(h * self.search_margin)
+        left, top = max(0, x - margin_x), max(0, y - margin_y)
+        right, bottom = min(small.shape[1], x + w + margin_x), min(small.shape[0], y + h + margin_y)
+        window = small[top:bottom, left:right]
+        if window.shape[0] < h or window.shape[1] < w:
+            return None
+        scores = cv.matchTemplate(window, track.template, cv.TM_CCOEFF_NORMED)
+        _, confidence, _, location = cv.minMaxLoc(scores)
+        return Track((left + location[0], top + location[1], w, h), track.template, confidence)
+
+    def downscale(self, gray):
+        if self.scale == 1:
+            return gray
+        return cv.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv.INTER_AREA)
+
+    def upscale(self, box):
+        return tuple(int(round(v / self.scale)) for v in box)
+
+    @staticmethod
+    def crop(small, box):
+        x, y, w, h = (int(v) for v in box)
+        return small[y:y + h, x:x + w].copy()
+
+
+class MotionGate:
+    """
+    运动门控
+    在缩小的灰度图上与上一帧做差, 变化像素比例达到 threshold, 或人体红外传感器报告有人时打开,
+    打开后保持 cooldown 秒, 关闭期间跳过人脸检测
+    """
+
+    def __init__(self, threshold=0.01, pixel_delta=25, scale=0.25, cooldown=2.0, presence=None):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.scale = scale
+        self.cooldown = cooldown
+        # 返回是否有人的函数, 如 BodyInfraredSensor.detection
+        self.presence = presence
+        self.lock = threading.Lock()
+        self.previous = None
+        self.open_until = 0.0
+        self.hits = 0
+        self.skips = 0
+        self.presence_hits = 0
+
+    def check(self, gray):
+        small = cv.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv.INTER_AREA)
+        small = cv.GaussianBlur(small, (5, 5), 0)
+        with self.lock:
+            previous, self.previous = self.previous, small
+        motion = previous is None or previous.shape != small.shape
+        if not motion:
+            _, changed = cv.threshold(cv.absdiff(small, previous), self.pixel_delta, 255, cv.THRESH_BINARY)
+            motion = cv.countNonZero(changed) >= self.threshold * small.size
+        if not motion and self.presence is not None and self.presence():
+            motion = True
+            self.presence_hits += 1
+        now = time.monotonic()
+        with self.lock:
+            if motion:
+                self.open_until = now + self.cooldown
+            if now < self.open_until:
+                self.hits += 1
+                return True
+            self.skips += 1
+            return False
+
+    def stats(self):
+        total = self.hits + self.skips
+        return {'hits': self.hits, 'skips': self.skips, 'presence_hits': self.presence_hits,
+                'skip_ratio': self.skips / total if total else 0}
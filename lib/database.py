@@ -1,12 +1,357 @@
-import pymysql
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
 
-conn = pymysql.connect(host='192.168.31.161', port=3306, user='root', password='lb82ndLF', db='pi-bot')
+# 数据持久化
+# 采集方把记录放入队列后立即返回, 后台写入线程按条数或时间攒批, 每种记录一条多行 INSERT 写入
+# 数据库连接放在连接池中, 出错的连接直接丢弃, 下次使用时重新连接
+# 数据库不可用时批次写入本地 SQLite (WAL) 缓存, 恢复后按顺序补写
+#
+# PI_BOT_DB 选择数据库: mysql 使用 config 中的 MySQL, sqlite:<路径> 使用本地 SQLite, 未设置时不记录
 
+config = {'host': '192.168.31.161', 'port': 3306, 'user': 'root', 'password': 'lb82ndLF', 'db': 'pi-bot'}
 
-def execute_sql(sql):
+SensorRecord = namedtuple('SensorRecord', ['timestamp', 'device', 'metric', 'value'])
+
+EventRecord = namedtuple('EventRecord', ['timestamp', 'source', 'kind', 'detail'])
+
+# 记录类型 -> 表名
+TABLES = {
+    SensorRecord: 'sensor_record',
+    EventRecord: 'event_record',
+}
+
+RECORD_TYPES = {record_type.__name__: record_type for record_type in TABLES}
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS sensor_record '
+    '(timestamp DOUBLE NOT NULL, device VARCHAR(64) NOT NULL, metric VARCHAR(32) NOT NULL, value DOUBLE)',
+    'CREATE TABLE IF NOT EXISTS event_record '
+    '(timestamp DOUBLE NOT NULL, source VARCHAR(64) NOT NULL, kind VARCHAR(32) NOT NULL, detail VARCHAR(255))',
+]
+
+
+class ConnectionPool:
+    """
+    数据库连接池
+    factory 创建新连接, paramstyle 为驱动的占位符 (pymysql 为 %s, sqlite3 为 ?)
+    max_params 为一条语句的参数个数上限, 多行 INSERT 按此拆分
+    """
+
+    def __init__(self, factory, size=2, paramstyle='%s', max_params=65535):
+        self.factory = factory
+        self.paramstyle = paramstyle
+        self.max_params = max_params
+        self.idle = queue.LifoQueue(maxsize=size)
+        self.slots = threading.BoundedSemaphore(size)
+        self.connects = 0
+        self.failures = 0
+
+    @contextmanager
+    def connection(self):
+        """
+        取出一个连接, 正常结束时提交并放回池中, 出错时回滚并丢弃该连接
+        """
+        with self.slots:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self.factory()
+                self.connects += 1
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                self.failures += 1
+                self.discard(conn)
+                raise
+            self.idle.put_nowait(conn)
+
+    @staticmethod
+    def discard(conn):
+        try:
+            conn.rollback()
+            conn.close()
+        except Exception:
+            pass
+
+    def execute(self, sql, params=()):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                return cursor.fetchall() if cursor.description else cursor.rowcount
+            finally:
+                cursor.close()
+
+    def create_tables(self):
+        for sql in SCHEMA:
+            self.execute(sql)
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def mysql_pool(size=2, **kwargs):
+    import pymysql
+    params = dict(config, **kwargs)
+    return ConnectionPool(lambda: pymysql.connect(connect_timeout=5, **params), size)
+
+
+def sqlite_pool(path, size=1):
+    def connect():
+        conn = sqlite3.connect(str(path), timeout=10, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+    # SQLite 3.32 之前每条语句最多 999 个参数
+    return ConnectionPool(connect, size, '?', 999)
+
+
+def insert_statement(record_type, rows, paramstyle):
+    """
+    多行 INSERT, 返回 (sql, 参数)
+    """
+    fields = record_type._fields
+    group = '(' + ', '.join([paramstyle] * len(fields)) + ')'
+    sql = 'INSERT INTO %s (%s) VALUES %s' % (TABLES[record_type], ', '.join(fields),
+                                             ', '.join([group] * len(rows)))
+    return sql, [value for row in rows for value in row]
+
+
+class SqliteSpool:
+    """
+    数据库不可用时的本地缓存, SQLite WAL 模式, 按写入顺序补写
+    """
+
+    def __init__(self, path='./file/spool.db', max_rows=500000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS spool (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                          'type TEXT NOT NULL, payload TEXT NOT NULL)')
+        self.conn.commit()
+
+    def put(self, records):
+        with self.lock:
+            self.conn.executemany('INSERT INTO spool (type, payload) VALUES (?, ?)',
+                                  [(type(record).__name__, json.dumps(record)) for record in records])
+            # 超过上限时丢弃最旧的记录
+            self.conn.execute('DELETE FROM spool WHERE id <= (SELECT MAX(id) FROM spool) - ?', (self.max_rows,))
+            self.conn.commit()
+
+    def take(self, limit=500):
+        """
+        最早的 limit 条记录, 返回 (最大 id, 记录列表), 写入成功后调用 delete
+        """
+        with self.lock:
+            rows = self.conn.execute('SELECT id, type, payload FROM spool ORDER BY id LIMIT ?', (limit,)).fetchall()
+        if not rows:
+            return None, []
+        return rows[-1][0], [RECORD_TYPES[name](*json.loads(payload)) for id, name, payload in rows]
+
+    def delete(self, last_id):
+        with self.lock:
+            self.conn.execute('DELETE FROM spool WHERE id <= ?', (last_id,))
+            self.conn.commit()
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM spool').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class BatchWriter:
+    """
+    后台批量写入
+    put 不阻塞, 队列满时丢弃并计入 dropped; 满 batch_size 条或距上次写入超过 flush_interval 秒时写入
+    本地缓存只在写入线程中访问, 不占用采集方的线程
+    """
+
+    def __init__(self, pool: ConnectionPool, spool: SqliteSpool = None, batch_size=200, flush_interval=2.0,
+                 max_queue=10000, retry_interval=5.0, backfill_batch=500, poll_interval=0.5):
+        self.pool = pool
+        self.spool = spool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.backfill_batch = backfill_batch
+        self.poll_interval = poll_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.running = True
+        self.online = True
+        self.retry_at = 0.0
+        self.written = 0
+        self.batches = 0
+        self.spooled = 0
+        self.backfilled = 0
+        self.dropped = 0
+        self.failures = 0
+        self.thread = threading.Thread(target=self.write_loop, name='database-writer', daemon=True)
+        self.thread.start()
+
+    def put(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def sensor(self, device, metric, value, timestamp=None):
+        self.put(SensorRecord(timestamp or time.time(), device, metric, value))
+
+    def event(self, source, kind, detail='', timestamp=None):
+        self.put(EventRecord(timestamp or time.time(), source, kind, detail))
+
+    def write_loop(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while self.running or not self.queue.empty() or batch:
+            try:
+                # 最多等待 poll_interval 秒, stop 后不必等到 flush_interval 结束
+                batch.append(self.queue.get(timeout=min(self.poll_interval, max(0.0, deadline - time.monotonic()))))
+            except queue.Empty:
+                pass
+            if len(batch) < self.batch_size and time.monotonic() < deadline and self.running:
+                continue
+            if batch:
+                self.flush(batch)
+                batch = []
+            elif self.online or time.monotonic() >= self.retry_at:
+                # 空闲时补写, 离线时按重试间隔探测数据库是否恢复
+                self.backfill()
+            deadline = time.monotonic() + self.flush_interval
+
+    def flush(self, batch):
+        if not self.online and time.monotonic() < self.retry_at:
+            self.to_spool(batch)
+            return
+        if self.write(batch):
+            self.backfill()
+        else:
+            self.to_spool(batch)
+
+    def write(self, records):
+        """
+        按记录类型分组, 每组一条多行 INSERT (参数超过 max_params 时拆成多条), 在同一个事务中提交
+        """
+        groups = {}
+        for record in records:
+            groups.setdefault(type(record), []).append(record)
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    for record_type, rows in groups.items():
+                        size = max(1, self.pool.max_params // len(record_type._fields))
+                        for start in range(0, len(rows), size):
+                            cursor.execute(*insert_statement(record_type, rows[start:start + size],
+                                                             self.pool.paramstyle))
+                finally:
+                    cursor.close()
+        except Exception as e:
+            self.failures += 1
+            if self.online:
+                print('数据库写入失败, 改为写入本地缓存:', e)
+            self.online = False
+            self.retry_at = time.monotonic() + self.retry_interval
+            return False
+        if not self.online:
+            print('数据库已恢复')
+        self.online = True
+        self.written += len(records)
+        self.batches += 1
+        return True
+
+    def to_spool(self, batch):
+        if self.spool is None:
+            self.dropped += len(batch)
+            return
+        self.spool.put(batch)
+        self.spooled += len(batch)
+
+    def backfill(self):
+        """
+        数据库可用时补写本地缓存, 每次最多 backfill_batch 条
+        """
+        if self.spool is None:
+            return
+        last_id, records = self.spool.take(self.backfill_batch)
+        if records and self.write(records):
+            self.spool.delete(last_id)
+            self.backfilled += len(records)
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=10)
+
+    def stats(self):
+        return {
+            'online': self.online,
+            'queued': self.queue.qsize(),
+            'written': self.written,
+            'batches': self.batches,
+            'spooled': self.spooled,
+            'backfilled': self.backfilled,
+            'spool_rows': self.spool.count() if self.spool is not None else 0,
+            'dropped': self.dropped,
+            'failures': self.failures,
+        }
+
+
+default_pool = None
+
+default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    默认的 MySQL 连接池, 第一次使用时创建
+    """
+    global default_pool
+    with default_pool_lock:
+        if default_pool is None:
+            default_pool = mysql_pool()
+        return default_pool
+
+
+def execute_sql(sql, params=()):
+    try:
+        return get_pool().execute(sql, params)
+    except Exception as e:
+        print('SQL 执行失败:', e)
+        raise
+
+
+def open_writer(spool_path='./file/spool.db'):
+    """
+    按 PI_BOT_DB 创建批量写入器, 未设置时返回 None
+    """
+    target = os.environ.get('PI_BOT_DB')
+    if not target:
+        return None
+    if target.startswith('sqlite:'):
+        pool = sqlite_pool(target[len('sqlite:'):])
+    elif target == 'mysql':
+        pool = mysql_pool()
+    else:
+        raise ValueError('PI_BOT_DB 只支持 mysql 或 sqlite:<路径>: ' + target)
     try:
-        with conn.cursor() as cursor:
-            cursor.execute(sql)
-        conn.commit()
+        pool.create_tables()
     except Exception as e:
-        conn.rollback()
+        print('数据库建表失败, 先写入本地缓存:', e)
+    return BatchWriter(pool, SqliteSpool(spool_path))
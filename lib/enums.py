@@ -68,6 +68,8 @@ class FunctionId(Enum):
 
     LIGHTING_DETECTION = 'lighting-detection'
 
+    WEATHER_UPDATE = 'weather-update'
+
     VIDEO_OUTPUT = 'video-output'
 
 
@@ -76,3 +78,82 @@ class Constants(Enum):
     DO_TYPE = 0
 
     AO_TYPE = 1
+
+
+@unique
+class HardwareBackend(Enum):
+
+    # 树莓派真实硬件
+    PI = 'pi'
+
+    # 模拟硬件, 用于无树莓派环境下运行与性能测试
+    SIM = 'sim'
+
+
+@unique
+class InputMode(Enum):
+
+    # GPIO 边沿中断
+    INTERRUPT = 'interrupt'
+
+    # 按间隔轮询电平
+    POLLING = 'polling'
+
+
+@unique
+class VideoOutput(Enum):
+
+    # 本地窗口 (cv.imshow), 需要图形界面
+    WINDOW = 'window'
+
+    # 本地 HTTP MJPEG 推流, 适用于无显示器的设备
+    MJPEG = 'mjpeg'
+
+
+@unique
+class ReadingQuality(Enum):
+
+    # 在有效期内的读数
+    OK = 'ok'
+
+    # 超过有效期未更新
+    STALE = 'stale'
+
+    # 还没有成功读取过
+    MISSING = 'missing'
+
+
+@unique
+class ExecutionMode(Enum):
+
+    # 每个功能一个线程
+    THREAD = 'thread'
+
+    # 声明了周期的功能由单个调度线程执行
+    SCHEDULER = 'scheduler'
+
+    # 所有功能在同一个 asyncio 事件循环中运行
+    ASYNCIO = 'asyncio'
+
+
+@unique
+class BuzzerPriority(IntEnum):
+
+    # 提示音, 如开机
+    NOTICE = 0
+
+    # 人体靠近警告
+    WARNING = 1
+
+    # 烟雾报警, 抢占其他声音
+    ALARM = 2
+
+
+@unique
+class I2cPriority(IntEnum):
+
+    # 显示刷新
+    DISPLAY = 0
+
+    # 传感器读取, 优先于显示刷新
+    SENSOR = 1
@@ -0,0 +1,204 @@
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+# 内存时序数据
+# 每个序列保存原始采样与 1 分钟 / 1 小时聚合 (min/max/mean), 都是固定容量的 array 环形缓冲, 内存占用在创建时确定
+# 时间戳单调递增, 区间查询用 bisect 在环形缓冲的两段上二分查找
+
+Point = namedtuple('Point', ['timestamp', 'value'])
+
+Rollup = namedtuple('Rollup', ['timestamp', 'min', 'max', 'mean', 'count'])
+
+# 分辨率 -> 聚合周期 (秒), 0 为原始采样
+RESOLUTIONS = {'raw': 0, '1m': 60, '1h': 3600}
+
+
+class RingBuffer:
+    """
+    固定容量的多列环形缓冲, 第一列为时间戳
+    """
+
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.columns = [array(typecode, bytes(array(typecode).itemsize * capacity)) for typecode in columns]
+        self.count = 0
+
+    def append(self, *values):
+        index = self.count % self.capacity
+        for column, value in zip(self.columns, values):
+            column[index] = value
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def segments(self):
+        """
+        按时间先后的两段下标区间 [(start, end), ...]
+        """
+        size = len(self)
+        start = (self.count - size) % self.capacity
+        if start + size <= self.capacity:
+            return [(start, start + size)]
+        return [(start, self.capacity), (0, size - (self.capacity - start))]
+
+    def range(self, start=None, end=None):
+        """
+        时间戳在 [start, end] 内的行, 按时间先后排列, 每行为各列的值
+        """
+        timestamps = self.columns[0]
+        rows = []
+        for lo, hi in self.segments():
+            left = lo if start is None else bisect_left(timestamps, start, lo, hi)
+            right = hi if end is None else bisect_right(timestamps, end, lo, hi)
+            rows.extend(zip(*(column[left:right] for column in self.columns)))
+        return rows
+
+    def last(self):
+        if not self.count:
+            return None
+        index = (self.count - 1) % self.capacity
+        return tuple(column[index] for column in self.columns)
+
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in self.columns)
+
+
+class Series:
+    """
+    单个传感器的时序数据
+    raw_capacity 条原始采样, minute_capacity 个 1 分钟聚合, hour_capacity 个 1 小时聚合
+    """
+
+    def __init__(self, name, raw_capacity=3600, minute_capacity=24 * 60, hour_capacity=24 * 30):
+        self.name = name
+        self.lock = threading.Lock()
+        self.raw = RingBuffer(raw_capacity, 'dd')
+        # 聚合: 时间戳 (周期起点), 最小, 最大, 平均, 采样数
+        self.rollups = {60: RingBuffer(minute_capacity, 'ddddl'), 3600: RingBuffer(hour_capacity, 'ddddl')}
+        # 当前未结束周期的累计值 [周期起点, 最小, 最大, 总和, 采样数]
+        self.pending = {period: None for period in self.rollups}
+        self.dropped = 0
+
+    def add(self, value, timestamp=None):
+        if value is None:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        value = float(value)
+        with self.lock:
+            last = self.raw.last()
+            if last is not None and timestamp < last[0]:
+                # 乱序的采样会破坏二分查找, 直接丢弃
+                self.dropped += 1
+                return
+            self.raw.append(timestamp, value)
+            for period in self.rollups:
+                self.accumulate(period, value, timestamp)
+
+    def accumulate(self, period, value, timestamp):
+        bucket = timestamp - timestamp % period
+        pending = self.pending[period]
+        if pending is not None and pending[0] != bucket:
+            self.close_bucket(period, pending)
+            pending = None
+        if pending is None:
+            self.pending[period] = [bucket, value, value, value, 1]
+            return
+        pending[1] = min(pending[1], value)
+        pending[2] = max(pending[2], value)
+        pending[3] += value
+        pending[4] += 1
+
+    def close_bucket(self, period, pending):
+        bucket, low, high, total, count = pending
+        self.rollups[period].append(bucket, low, high, total / count, count)
+
+    def latest(self):
+        with self.lock:
+            last = self.raw.last()
+        return Point(*last) if last is not None else None
+
+    def query(self, start=None, end=None, resolution='raw'):
+        """
+        区间查询, raw 返回 Point 列表, 1m / 1h 返回 Rollup 列表 (含当前未结束的周期)
+        """
+        period = RESOLUTIONS[resolution]
+        with self.lock:
+            if not period:
+                return [Point(*row) for row in self.raw.range(start, end)]
+            rows = [Rollup(*row) for row in self.rollups[period].range(start, end)]
+            pending = self.pending[period]
+            if pending is not None and (start is None or pending[0] >= start) and (end is None or pending[0] <= end):
+                bucket, low, high, total, count = pending
+                rows.append(Rollup(bucket, low, high, total / count, count))
+            return rows
+
+    def summary(self, seconds, now=None):
+        """
+        最近 seconds 秒原始采样的最小, 最大, 平均值, 没有采样时返回 None
+        """
+        now = time.time() if now is None else now
+        values = [point.value for point in self.query(now - seconds, now)]
+        if not values:
+            return None
+        return Rollup(now - seconds, min(values), max(values), math.fsum(values) / len(values), len(values))
+
+    def nbytes(self):
+        return self.raw.nbytes() + sum(buffer.nbytes() for buffer in self.rollups.values())
+
+
+class TimeSeriesStore:
+    """
+    按名称管理序列, 名称一般为 '<设备>.<指标>', 如 'default-thermometer.temperature'
+    所有序列的容量相同, 内存上限为 max_series * 单个序列大小
+    """
+
+    def __init__(self, raw_capacity=3600, minute_capacity=24 * 60, hour_capacity=24 * 30, max_series=32):
+        self.raw_capacity = raw_capacity
+        self.minute_capacity = minute_capacity
+        self.hour_capacity = hour_capacity
+        self.max_series = max_series
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def get(self, name, create=True):
+        series = self.series.get(name)
+        if series is not None or not create:
+            return series
+        with self.lock:
+            series = self.series.get(name)
+            if series is None:
+                if len(self.series) >= self.max_series:
+                    raise ValueError('时序数据序列已满: %d' % self.max_series)
+                series = self.series[name] = Series(name, self.raw_capacity, self.minute_capacity,
+                                                    self.hour_capacity)
+            return series
+
+    def add(self, name, value, timestamp=None):
+        self.get(name).add(value, timestamp)
+
+    def latest(self, name):
+        series = self.get(name, False)
+        return series.latest() if series is not None else None
+
+    def query(self, name, start=None, end=None, resolution='raw'):
+        series = self.get(name, False)
+        return series.query(start, end, resolution) if series is not None else []
+
+    def names(self):
+        return list(self.series)
+
+    def nbytes(self):
+        return sum(series.nbytes() for series in list(self.series.values()))
+
+    def stats(self):
+        return {name: {'samples': series.raw.count, 'dropped': series.dropped, 'bytes': series.nbytes()}
+                for name, series in list(self.series.items())}
+
+
+# 进程内共享的默认存储
+store = TimeSeriesStore()
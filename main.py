@@ -1,26 +1,27 @@
+import os
+
 from core import gpio
 from core.base import Bot
-from core.devices import Buzzer, Smog, Thermometer, BodyInfraredSensor, OledDisplay, DeviceManager, PCF8591, Camera
+from core.devices import DeviceManager, plugin
 from core.function import FunctionManager
-from lib.enums import DevicesId, GpioBmcEnums, Constants
+from lib.enums import DevicesId, GpioBmcEnums, Constants, ExecutionMode
 
 
 def init_devices():
-    buzzer = Buzzer(DevicesId.DEFAULT_BUZZER, GpioBmcEnums.GPIO_7)
-    smog = Smog(DevicesId.DEFAULT_SMOG, GpioBmcEnums.GPIO_11, Constants.DO_TYPE)
-    thermometer = Thermometer(DevicesId.DEFAULT_THERMOMETER, GpioBmcEnums.GPIO_12)
-    body_infrared_sensor = BodyInfraredSensor(DevicesId.DEFAULT_BODY_INFRARED_SENSOR, GpioBmcEnums.GPIO_13)
-    oled_display = OledDisplay(DevicesId.DEFAULT_OLED_DISPLAY)
-    pcf8591 = PCF8591(DevicesId.DEFAULT_PCF8591, 1, 0x48)
-    camera = Camera(DevicesId.DEFAULT_CAMERA, GpioBmcEnums.GPIO_15)
+    """
+    设备声明, 设备的创建与 setup 由 DeviceManager 并行执行, 驱动模块在创建设备时才导入
+    依赖其他设备的在 depends 中声明, 依赖的设备追加在参数之后传给驱动; 没有接摄像头的设备删除对应的声明即可
+    """
     return {
-        buzzer.device_id: buzzer,
-        smog.device_id: smog,
-        thermometer.device_id: thermometer,
-        body_infrared_sensor.device_id: body_infrared_sensor,
-        oled_display.device_id: oled_display,
-        pcf8591.device_id: pcf8591,
-        camera.device_id: camera
+        DevicesId.DEFAULT_BUZZER: plugin('Buzzer', DevicesId.DEFAULT_BUZZER, GpioBmcEnums.GPIO_7),
+        DevicesId.DEFAULT_SMOG: plugin('Smog', DevicesId.DEFAULT_SMOG, GpioBmcEnums.GPIO_11, Constants.DO_TYPE),
+        DevicesId.DEFAULT_THERMOMETER: plugin('Thermometer', DevicesId.DEFAULT_THERMOMETER, GpioBmcEnums.GPIO_12),
+        DevicesId.DEFAULT_BODY_INFRARED_SENSOR: plugin('BodyInfraredSensor', DevicesId.DEFAULT_BODY_INFRARED_SENSOR,
+                                                       GpioBmcEnums.GPIO_13),
+        DevicesId.DEFAULT_OLED_DISPLAY: plugin('OledDisplay', DevicesId.DEFAULT_OLED_DISPLAY),
+        DevicesId.DEFAULT_PCF8591: plugin('PCF8591', DevicesId.DEFAULT_PCF8591, 1, 0x48, sample_rate=10),
+        DevicesId.DEFAULT_CAMERA: plugin('Camera', DevicesId.DEFAULT_CAMERA, GpioBmcEnums.GPIO_15, motion_gate=True,
+                                         record=True),
     }
 
 
@@ -30,13 +31,23 @@ if __name__ == '__main__':
     try:
         print('正在注册设备中...')
         device_manager = DeviceManager(init_devices())
+        device_manager.wait_ready()
+        device_manager.report()
         print('正在初始化功能...')
-        function_manager = FunctionManager()
+        # PI_BOT_EXECUTION=scheduler 时周期性功能由单个调度线程执行, asyncio 时所有功能在一个事件循环中运行
+        mode = ExecutionMode(os.environ.get('PI_BOT_EXECUTION', ExecutionMode.THREAD.value))
+        if mode == ExecutionMode.ASYNCIO:
+            from core.aio import AsyncFunctionManager
+            function_manager = AsyncFunctionManager()
+        else:
+            function_manager = FunctionManager(mode)
         print('正在初始化机器人...')
         pi_bot = Bot(None, device_manager, function_manager)
         print('正在启动功能...')
         pi_bot.on()
         print('机器人已就绪')
+        # 调度线程是守护线程, 主线程在这里等待到 stop_all, Ctrl+C 时执行下面的 destroy
+        function_manager.join()
     except KeyboardInterrupt:
         if pi_bot is not None:
             pi_bot.destroy()
@@ -0,0 +1,217 @@
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from lib import database
+from lib.database import BatchWriter, SensorRecord, SqliteSpool, sqlite_pool
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('等待超时')
+        time.sleep(0.01)
+
+
+class RecordingCursor:
+    """
+    记录执行的 SQL, fail 为 True 时模拟数据库不可用
+    """
+
+    def __init__(self, cursor, owner):
+        self.cursor = cursor
+        self.owner = owner
+
+    def execute(self, sql, params=()):
+        if self.owner.fail:
+            raise sqlite3.OperationalError('database is down')
+        self.owner.statements.append((sql, len(params)))
+        return self.cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+class RecordingConnection:
+
+    def __init__(self, conn, owner):
+        self.conn = conn
+        self.owner = owner
+        self.closed = False
+
+    def cursor(self):
+        return RecordingCursor(self.conn.cursor(), self.owner)
+
+    def close(self):
+        self.closed = True
+        self.conn.close()
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+class DatabaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+        self.pool = sqlite_pool(self.directory.joinpath('pi-bot.db'))
+        self.statements = []
+        self.fail = False
+        self.connections = []
+        factory = self.pool.factory
+
+        def connect():
+            conn = RecordingConnection(factory(), self)
+            self.connections.append(conn)
+            return conn
+
+        self.pool.factory = connect
+        self.pool.create_tables()
+        self.writers = []
+
+    def tearDown(self):
+        for writer in self.writers:
+            writer.stop()
+            if writer.spool is not None:
+                writer.spool.close()
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def writer(self, spool=True, **kwargs):
+        spool = SqliteSpool(self.directory.joinpath('spool.db')) if spool else None
+        writer = BatchWriter(self.pool, spool, **kwargs)
+        self.writers.append(writer)
+        return writer
+
+    def inserts(self):
+        return [statement for statement in self.statements if statement[0].startswith('INSERT')]
+
+    def sensor_values(self):
+        return [row[0] for row in self.pool.execute('SELECT value FROM sensor_record ORDER BY rowid')]
+
+
+class BatchWriterTest(DatabaseTestCase):
+
+    def test_flush_on_batch_size(self):
+        writer = self.writer(batch_size=5, flush_interval=60)
+        for value in range(5):
+            writer.sensor('thermometer', 'temperature', value)
+        wait_for(lambda: writer.written == 5)
+        # 一批记录为一条多行 INSERT
+        self.assertEqual(len(self.inserts()), 1)
+        self.assertEqual(self.inserts()[0][1], 5 * len(SensorRecord._fields))
+        self.assertEqual(self.inserts()[0][0].count('(?, ?, ?, ?)'), 5)
+        self.assertEqual(self.sensor_values(), [0, 1, 2, 3, 4])
+
+    def test_flush_on_interval(self):
+        writer = self.writer(batch_size=100, flush_interval=0.2)
+        for value in range(3):
+            writer.sensor('thermometer', 'humidity', value)
+        wait_for(lambda: writer.written == 3)
+        self.assertEqual(len(self.inserts()), 1)
+        self.assertEqual(self.inserts()[0][0].count('(?, ?, ?, ?)'), 3)
+        self.assertEqual(writer.batches, 1)
+
+    def test_mixed_records_use_one_insert_per_type(self):
+        writer = self.writer(batch_size=4, flush_interval=60)
+        writer.sensor('thermometer', 'temperature', 1)
+        writer.event('smog', 'smoke')
+        writer.sensor('thermometer', 'temperature', 2)
+        writer.event('body', 'body')
+        wait_for(lambda: writer.written == 4)
+        tables = sorted(sql.split()[2] for sql, count in self.inserts())
+        self.assertEqual(tables, ['event_record', 'sensor_record'])
+
+    def test_spool_while_database_fails(self):
+        self.fail = True
+        writer = self.writer(batch_size=5, flush_interval=0.05, retry_interval=60)
+        for value in range(12):
+            writer.sensor('pcf8591', 'luminance', value)
+        wait_for(lambda: writer.spooled == 12)
+        self.assertFalse(writer.online)
+        self.assertEqual(writer.written, 0)
+        self.assertEqual(writer.spool.count(), 12)
+        journal_mode = writer.spool.conn.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(journal_mode, 'wal')
+
+    def test_backfill_in_order_after_recovery(self):
+        self.fail = True
+        writer = self.writer(batch_size=4, flush_interval=0.05, retry_interval=0.2, backfill_batch=3)
+        for value in range(10):
+            writer.sensor('pcf8591', 'luminance', value)
+        wait_for(lambda: writer.spooled == 10)
+        self.fail = False
+        wait_for(lambda: writer.backfilled == 10)
+        self.assertTrue(writer.online)
+        self.assertEqual(writer.spool.count(), 0)
+        self.assertEqual(self.sensor_values(), list(range(10)))
+
+    def test_drop_without_spool(self):
+        self.fail = True
+        writer = self.writer(spool=False, batch_size=2, flush_interval=0.05, retry_interval=60)
+        for value in range(4):
+            writer.sensor('pcf8591', 'luminance', value)
+        wait_for(lambda: writer.dropped == 4)
+        self.assertEqual(writer.stats()['spool_rows'], 0)
+
+    def test_split_insert_over_parameter_limit(self):
+        # 500 条记录 2000 个参数, 超过旧版 SQLite 的 999 个上限, 需要拆成多条 INSERT
+        writer = self.writer(batch_size=500, flush_interval=60)
+        for value in range(500):
+            writer.sensor('pcf8591', 'luminance', value)
+        wait_for(lambda: writer.written == 500)
+        self.assertTrue(all(count <= self.pool.max_params for sql, count in self.inserts()))
+        self.assertEqual(len(self.inserts()), 3)
+        self.assertEqual(writer.batches, 1)
+        self.assertEqual(self.sensor_values(), list(range(500)))
+
+    def test_put_drops_when_queue_full(self):
+        writer = self.writer(max_queue=3)
+        # 停止写入线程, 队列不再被取走
+        writer.stop()
+        for value in range(5):
+            writer.sensor('pcf8591', 'luminance', value)
+        # 队列满时在采集方线程中丢弃, 不写入本地缓存
+        self.assertEqual(writer.dropped, 2)
+        self.assertEqual(writer.spooled, 0)
+        self.assertEqual(writer.spool.count(), 0)
+        self.assertEqual(writer.stats()['queued'], 3)
+
+
+class ConnectionPoolTest(DatabaseTestCase):
+
+    def test_reuse_connection(self):
+        self.pool.execute('SELECT 1')
+        self.pool.execute('SELECT 1')
+        self.assertEqual(len(self.connections), 1)
+
+    def test_discard_failed_connection(self):
+        self.pool.execute('SELECT 1')
+        failed = self.connections[0]
+        self.fail = True
+        with self.assertRaises(sqlite3.OperationalError):
+            self.pool.execute('SELECT 1')
+        self.assertTrue(failed.closed)
+        self.assertEqual(self.pool.failures, 1)
+        self.fail = False
+        self.assertEqual(self.pool.execute('SELECT 1'), [(1,)])
+        self.assertEqual(len(self.connections), 2)
+        self.assertIsNot(self.connections[1], failed)
+
+
+class InsertStatementTest(unittest.TestCase):
+
+    def test_multi_row(self):
+        rows = [SensorRecord(1.0, 'a', 'b', 2.0), SensorRecord(3.0, 'c', 'd', 4.0)]
+        sql, params = database.insert_statement(SensorRecord, rows, '%s')
+        self.assertEqual(sql, 'INSERT INTO sensor_record (timestamp, device, metric, value) '
+                              'VALUES (%s, %s, %s, %s), (%s, %s, %s, %s)')
+        self.assertEqual(params, [1.0, 'a', 'b', 2.0, 3.0, 'c', 'd', 4.0])
+
+
+if __name__ == '__main__':
+    unittest.main()